@@ -25,7 +25,23 @@ NuageVsdGroup = [
                help='nuage vsd organization name'),
     cfg.StrOpt('nuage_cms_id', default=None,
                help=('ID of a Cloud Management System on the VSD which '
-                     'identifies this OpenStack instance'))
+                     'identifies this OpenStack instance')),
+    cfg.StrOpt('nuage_vsd_metrics_file', default='',
+               help="File to write per endpoint VSD request metrics to "
+                    "when the test run ends, suffixed with the process ID "
+                    "of each test worker, e.g. metrics.1234.json"),
+    cfg.StrOpt('nuage_vsd_metrics_format', default='json',
+               choices=['json', 'prometheus'],
+               help="Format of the VSD request metrics report"),
+    cfg.StrOpt('nuage_vsd_cassette', default='',
+               help="Cassette file to record VSD REST traffic to, or to "
+                    "replay it from instead of talking to the VSD"),
+    cfg.StrOpt('nuage_vsd_cassette_mode', default='record',
+               choices=['record', 'replay'],
+               help="Whether to record or replay nuage_vsd_cassette"),
+    cfg.StrOpt('nuage_vsd_cassette_match', default='strict',
+               choices=['strict', 'lenient'],
+               help="How replayed requests are matched with recorded ones")
 ]
 
 nuage_vsd_group = cfg.OptGroup(name='nuage',
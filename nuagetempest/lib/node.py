@@ -5,6 +5,84 @@
 """
 
 import uuid
+from collections import OrderedDict
+
+
+class ChildList(object):
+    """
+    Insertion ordered identifiers of the children of a Node.
+
+    Append, remove and membership tests are O(1). The list operations
+    used on fpointer (iteration, len, in, indexing, append, remove,
+    extend, +=, comparison with lists) keep working. Leaves are the
+    majority of the nodes of a tree, so the OrderedDict is only
+    allocated with the first child.
+    """
+
+    __slots__ = ('_ids',)
+
+    def __init__(self, ids=None):
+        self._ids = None
+        if ids:
+            self.extend(ids)
+
+    def __contains__(self, nid):
+        return self._ids is not None and nid in self._ids
+
+    def __eq__(self, other):
+        if isinstance(other, (ChildList, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __getitem__(self, index):
+        """O(k), prefer iterating"""
+        return list(self)[index]
+
+    def __getstate__(self):
+        # never empty, copy and pickle skip __setstate__ for a false state
+        return (list(self),)
+
+    def __iadd__(self, ids):
+        self.extend(ids)
+        return self
+
+    def __iter__(self):
+        return iter(self._ids) if self._ids is not None else iter(())
+
+    def __len__(self):
+        return len(self._ids) if self._ids is not None else 0
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __reversed__(self):
+        return reversed(self._ids) if self._ids is not None else iter(())
+
+    def __setstate__(self, state):
+        self.__init__(state[0])
+
+    __hash__ = None
+
+    def append(self, nid):
+        if self._ids is None:
+            self._ids = OrderedDict()
+        self._ids[nid] = None
+
+    def extend(self, ids):
+        for nid in list(ids):
+            self.append(nid)
+
+    def remove(self, nid):
+        """Remove nid, raise ValueError if it is not a child"""
+        if nid not in self:
+            raise ValueError('%s is not a child' % nid)
+        del self._ids[nid]
+        if not self._ids:
+            self._ids = None
 
 
 class Node(object):
@@ -16,6 +94,11 @@ class Node(object):
     #: ADD, DELETE, INSERT constants :
     (ADD, DELETE, INSERT) = list(range(3))
 
+    # no per instance __dict__, trees of the scale generator hold millions
+    # of nodes
+    __slots__ = ('_identifier', '_tag', 'expanded', '_bpointer', '_fpointer',
+                 'os_data', 'vsd_data', 'vsc_data', 'vrs_data', 'user_data')
+
     def __init__(self, tag=None, identifier=None, expanded=True, os_data=None,
                  vsd_data=None, vsc_data=None, vrs_data=None, user_data=None):
         """Create a new Node object to be placed inside a Tree object"""
@@ -37,7 +120,7 @@ class Node(object):
         #: identifier of the parent's node :
         self._bpointer = None
         #: identifier(s) of the soons' node(s) :
-        self._fpointer = list()
+        self._fpointer = ChildList()
 
         #: None or whatever given as a parameter
         self.os_data = os_data
@@ -45,10 +128,26 @@ class Node(object):
         self.vsc_data = vsc_data
         self.vrs_data = vrs_data
         self.user_data = user_data
-        
+
+    def __copy__(self):
+        """Return a node sharing the data of this one, with its own list
+        of children.
+        """
+        node = self.__class__.__new__(self.__class__)
+        node.__setstate__(self.__getstate__())
+        node._fpointer = ChildList(self._fpointer)
+        return node
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
     def __lt__(self, other):
         return self.tag < other.tag
 
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def _set_identifier(self, nid):
         """Initialize self._set_identifier"""
         if nid is None:
@@ -80,13 +179,9 @@ class Node(object):
     def fpointer(self, value):
         """set the value of _fpointer; see above for the getter"""
         if value is None:
-            self._fpointer = list()
-        elif isinstance(value, list):
-            self._fpointer = value
-        elif isinstance(value, dict):
-            self._fpointer = list(value.keys())
-        elif isinstance(value, set):
-            self._fpointer = list(value)
+            self._fpointer = ChildList()
+        elif isinstance(value, (ChildList, list, dict, set)):
+            self._fpointer = ChildList(value)
         else:  # TODO: add deprecated routine
             pass
 
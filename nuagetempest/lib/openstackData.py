@@ -1,23 +1,157 @@
+import copy
+import io
+from collections import OrderedDict
+
 from tree import Tree
 from node import Node
 
+
+def resource_type(node):
+    """Return the type of the user_data of node, None if it has none"""
+    if isinstance(node.user_data, dict):
+        # user_data objects saved by save_resources()
+        return node.user_data.get('type')
+    return getattr(node.user_data, 'type', None)
+
+
+def vsd_external_id(obj):
+    """Return the VSD externalID of a vspk object or of its dict"""
+    if isinstance(obj, dict):
+        return obj.get('externalID')
+    return getattr(obj, 'external_id', None)
+
+
+def resource_external_ids(node):
+    """Return the VSD externalIDs of node, its vsd_data being an object
+    or a list of objects.
+    """
+    vsd_data = node.vsd_data
+    objects = vsd_data if isinstance(vsd_data, list) else [vsd_data]
+    return [ext_id for ext_id in map(vsd_external_id, objects) if ext_id]
+
+
+def resource_os_id(node):
+    """Return the OpenStack ID of node, None if it has none"""
+    if isinstance(node.os_data, dict):
+        return node.os_data.get('id')
+    return None
+
+
 class openstackData():
-    def __init__(self):
+    def __init__(self, indexed=True):
+        """@param indexed keep the indexes the get_resource(s)_by_*
+        queries are answered from, they scan the tree otherwise.
+        """
+        self.indexed = indexed
         self.resources = Tree()
         self.resources.create_node('CMS','CMS')
-        
+        # tags whose user_data no snapshot shares, None if there is none
+        self._owned_user_data = None
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the indexes from the tree"""
+        # type -> tags, (parent tag, type) -> tags, as ordered sets
+        self._by_type = {}
+        self._by_parent_type = {}
+        # OpenStack ID -> tag, VSD externalID -> tag, both being unique
+        self._by_os_id = {}
+        self._by_external_id = {}
+        if self.indexed:
+            for node in self.resources.all_nodes():
+                self._index(node)
+
+    def _index(self, node):
+        self._index_type(node.identifier, node.bpointer, resource_type(node))
+        self._index_ids(node)
+
+    def _unindex(self, node):
+        self._unindex_type(node.identifier, node.bpointer,
+                           resource_type(node))
+        self._unindex_ids(node)
+
+    def _index_type(self, tag, parent, res_type):
+        if res_type is not None:
+            self._by_type.setdefault(res_type, OrderedDict())[tag] = None
+            self._by_parent_type.setdefault(
+                (parent, res_type), OrderedDict())[tag] = None
+
+    def _unindex_type(self, tag, parent, res_type):
+        if res_type is None:
+            return
+        for index, key in ((self._by_type, res_type),
+                           (self._by_parent_type, (parent, res_type))):
+            tags = index.get(key)
+            if tags is not None:
+                tags.pop(tag, None)
+                if not tags:
+                    del index[key]
+
+    def _index_ids(self, node):
+        os_id = resource_os_id(node)
+        if os_id is not None:
+            self._by_os_id[os_id] = node.identifier
+        for external_id in resource_external_ids(node):
+            self._by_external_id[external_id] = node.identifier
+
+    def _unindex_ids(self, node):
+        os_id = resource_os_id(node)
+        if os_id is not None and self._by_os_id.get(os_id) == node.identifier:
+            del self._by_os_id[os_id]
+        for external_id in resource_external_ids(node):
+            if self._by_external_id.get(external_id) == node.identifier:
+                del self._by_external_id[external_id]
+
     def insert_resource(self, tag, parent, os_data=None,
                         vsd_data=None, vsc_data=None,
                         vrs_data=None, user_data=None):
-        self.resources.create_node(tag, tag, parent=parent,
-                                   os_data=os_data, vrs_data=vrs_data,
-                                   vsd_data=vsd_data, vsc_data=vsc_data,
-                                   user_data=user_data)
+        node = self.resources.create_node(tag, tag, parent=parent,
+                                          os_data=os_data, vrs_data=vrs_data,
+                                          vsd_data=vsd_data,
+                                          vsc_data=vsc_data,
+                                          user_data=user_data)
+        if self._owned_user_data is not None:
+            self._owned_user_data.add(tag)
+        if self.indexed:
+            self._index(node)
 
     def print_openstackData(self):
         self.resources.show(line_type="ascii-em")
+
+    def snapshot(self):
+        """Return a copy of the resources sharing the unchanged nodes and
+        data with these, see Tree.snapshot()
+        """
+        data = openstackData(indexed=False)
+        data.indexed = self.indexed
+        data.resources = self.resources.snapshot()
+        data._by_type = dict((key, OrderedDict(tags)) for key, tags
+                             in self._by_type.items())
+        data._by_parent_type = dict((key, OrderedDict(tags)) for key, tags
+                                    in self._by_parent_type.items())
+        data._by_os_id = dict(self._by_os_id)
+        data._by_external_id = dict(self._by_external_id)
+        # every user_data is shared now, see get_writable_user_data()
+        self._owned_user_data = set()
+        data._owned_user_data = set()
+        return data
+
+    def save_resources(self, filename, default=None):
+        """Save the resources as JSON Lines, see Tree.write_json()"""
+        with io.open(filename, 'w', encoding='utf-8') as f:
+            self.resources.write_json(f, default=default)
+
+    def load_resources(self, filename):
+        """Replace the resources by those saved by save_resources()"""
+        with io.open(filename, encoding='utf-8') as f:
+            self.resources = Tree.read_json(f)
+        self._owned_user_data = None
+        self.reindex()
     
     def delete_resource(self, tag):
+        if self.indexed and self.resources.contains(tag):
+            for nid in self.resources.expand_tree(tag):
+                self._unindex(self.resources[nid])
         resp = self.resources.remove_node(tag)
         if resp < 1:
             raise Exception("Resource removal failed.")
@@ -28,22 +162,101 @@ class openstackData():
             raise Exception("Returned node is not of type Node")
         return resp
     
+    def get_writable_user_data(self, tag):
+        """Return the user_data of tag, to be changed in place.
+
+        The first call after a snapshot replaces the user_data, through
+        update_resource(), by a deep copy, so that changing its lists
+        does not change the snapshot.
+        """
+        user_data = self.get_resource(tag).user_data
+        if (self._owned_user_data is None or tag in self._owned_user_data
+                or user_data is None):
+            return user_data
+        self.update_resource(tag, user_data=copy.deepcopy(user_data))
+        return self.get_resource(tag).user_data
+
     def get_children_resources(self, tag):
         resp = self.resources.children(tag)
         if not isinstance(resp, list):
             raise Exception("Did not get a list")
         return resp
 
+    def get_children_resources_by_type(self, tag, res_type):
+        """Return the children of tag of type res_type, O(k), in the
+        order they got that type.
+        """
+        if not self.indexed:
+            return [child for child in self.get_children_resources(tag)
+                    if resource_type(child) == res_type]
+        self.resources[tag]
+        return [self.resources[child] for child in
+                self._by_parent_type.get((tag, res_type), ())]
+
+    def get_resources_by_type(self, res_type):
+        """Return the resources of type res_type, O(k)"""
+        if not self.indexed:
+            return [node for node in self.resources.all_nodes()
+                    if resource_type(node) == res_type]
+        return [self.resources[tag] for tag in
+                self._by_type.get(res_type, ())]
+
+    def get_resource_by_os_id(self, os_id):
+        """Return the resource whose os_data id is os_id, None if there
+        is none.
+        """
+        if not self.indexed:
+            return next((node for node in self.resources.all_nodes()
+                         if resource_os_id(node) == os_id), None)
+        tag = self._by_os_id.get(os_id)
+        return self.resources[tag] if tag is not None else None
+
+    def get_resource_by_external_id(self, external_id):
+        """Return the resource whose vsd_data has externalID external_id,
+        None if there is none.
+        """
+        if not self.indexed:
+            return next((node for node in self.resources.all_nodes()
+                         if external_id in resource_external_ids(node)),
+                        None)
+        tag = self._by_external_id.get(external_id)
+        return self.resources[tag] if tag is not None else None
+
     def is_resource_present(self, tag):
         resp = self.resources.contains(tag)
         return resp
     
     def move_resource(self, tag, new_parent):
-        self.resources.move_node(tag, new_parent)
+        node = self.resources.get_node(tag) if self.indexed else None
+        if node:
+            self._unindex(node)
+        try:
+            self.resources.move_node(tag, new_parent)
+        finally:
+            if node:
+                # move_node() copies the node if a snapshot shares it
+                node = self.resources.get_node(tag)
+                self._index(node)
         
     def update_resource(self, tag, os_data=None,
                         vsd_data=None, vsc_data=None,
                         vrs_data=None, user_data=None):
-        self.resources.update_node(tag, os_data=os_data,
-                        vsd_data=vsd_data, vsc_data=vsc_data,
-                        vrs_data=vrs_data, user_data=user_data)
+        node = self.resources.get_node(tag) if self.indexed else None
+        if node:
+            res_type = resource_type(node)
+            self._unindex_ids(node)
+        try:
+            self.resources.update_node(tag, os_data=os_data,
+                            vsd_data=vsd_data, vsc_data=vsc_data,
+                            vrs_data=vrs_data, user_data=user_data)
+            if user_data and self._owned_user_data is not None:
+                self._owned_user_data.add(tag)
+        finally:
+            if node:
+                # update_node() copies the node if a snapshot shares it
+                node = self.resources.get_node(tag)
+                self._index_ids(node)
+                # a resource keeps its place unless its type changes
+                if resource_type(node) != res_type:
+                    self._unindex_type(tag, node.bpointer, res_type)
+                    self._index_type(tag, node.bpointer, resource_type(node))
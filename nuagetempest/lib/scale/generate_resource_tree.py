@@ -134,46 +134,36 @@ class UserResourceData(object):
             raise Exception("Provided dataStruct is not of type openstackData")
         try:
             self.root = self.DS.get_resource('CMS')
-            self.root.user_data = self.root.user_data if self.root.user_data else CMS()
+            if not self.root.user_data:
+                # through update_resource() for the CMS type to be indexed
+                self.DS.update_resource('CMS', user_data=CMS())
+                self.root = self.DS.get_resource('CMS')
         except Exception:
             raise Exception("Root CMS for this tree not present")
 
     def return_children_of_type(self, parent, type):
         try:
-            children = self.DS.get_children_resources(parent)
+            is_leaf = self.DS.get_resource(parent).is_leaf()
         except Exception:
-            LOG.debug('No {} currently present in tree'.format(type))
-        except NodeIDAbsentError:
             raise Exception("Node ID is absent in the tree")
-        return_children = []
-        if not children:
+        if is_leaf:
             raise Exception("Children not p")
-        for child in children:  
-            if child.user_data.type == type:
-                return_children.append(child)
-        return return_children
+        return self.DS.get_children_resources_by_type(parent, type)
 
     def check_if_type_present(self, parent, type):
         '''Return number of type object children
         and type of that object
         '''
-        try:
-            children = self.DS.get_children_resources(parent)
-        except Exception:
-            LOG.debug('No {} currently present in tree'.format(type))
-        LOG.debug("{} Children currently present in tree".format(len(children)))
+        children = self.DS.get_children_resources_by_type(parent, type)
+        LOG.debug("{} {} children currently present in tree".format(
+            len(children), type))
         number_of_type_objects = 0
         highest_type_object_offset= 0
         for child in children:
-            try:
-                child.user_data.type
-            except NameError:
-                continue
-            if child.user_data.type == type:
-                number_of_type_objects += 1
-                offset = re.compile(r'(\d+)$').search(child.user_data.name).group(1)
-                if offset > highest_type_object_offset:
-                    highest_type_object_offset = offset
+            number_of_type_objects += 1
+            offset = re.compile(r'(\d+)$').search(child.user_data.name).group(1)
+            if offset > highest_type_object_offset:
+                highest_type_object_offset = offset
         return  number_of_type_objects, int(highest_type_object_offset)
 
     def check_return_max_offset_from_list(self, resource_list):
@@ -205,7 +195,7 @@ class UserResourceData(object):
             name = 't-{}'.format(offset + i)
             tenant = UserTenant(name)
             self.DS.insert_resource(name, parent='CMS', user_data=tenant)
-            self.root.user_data.tenantslist.append(name)
+            self.DS.get_writable_user_data('CMS').tenantslist.append(name)
     
     def check_user_enterprise_in_tenant(self):
         num, offset = self.check_if_type_present('CMS', 'Enterprise')
@@ -218,7 +208,7 @@ class UserResourceData(object):
             name = 'e-{}'.format(offset + i)
             ent = UserEnterprise(name)
             self.DS.insert_resource(name, parent='CMS', user_data=ent)
-            self.root.user_data.enterpriseslist.append(name)
+            self.DS.get_writable_user_data('CMS').enterpriseslist.append(name)
 
     def check_user_domains_in_enterprise(self, enterprise):
         num, offset = self.check_if_type_present(enterprise, 'Domain')
@@ -233,9 +223,8 @@ class UserResourceData(object):
             dom = UserDomain(name)
             dom.enterprise = parent
             self.DS.insert_resource(name, parent=parent, user_data=dom)
-            self.root.user_data.domainslist.append(name)
-            parent_ent = self.DS.get_resource(dom.enterprise)
-            parent_ent.user_data.domainslist.append(name)
+            self.DS.get_writable_user_data('CMS').domainslist.append(name)
+            self.DS.get_writable_user_data(dom.enterprise).domainslist.append(name)
 
     def check_user_l2domains_in_enterprise(self, enterprise):
         num, offset = self.check_if_type_present(enterprise, 'L2Domain')
@@ -250,9 +239,8 @@ class UserResourceData(object):
             l2dom = UserL2Domain(name)
             l2dom.enterprise = parent
             self.DS.insert_resource(name, parent=parent, user_data=l2dom)
-            self.root.user_data.l2domainslist.append(name)
-            parent_ent = self.DS.get_resource(l2dom.enterprise)
-            parent_ent.user_data.l2domainslist.append(name)
+            self.DS.get_writable_user_data('CMS').l2domainslist.append(name)
+            self.DS.get_writable_user_data(l2dom.enterprise).l2domainslist.append(name)
 
     def check_user_zones_in_domain(self, domain):
         num, offset = self.check_if_type_present(domain, 'Zone')
@@ -269,11 +257,9 @@ class UserResourceData(object):
             zon.domain = parent
             zon.enterprise = gparent
             self.DS.insert_resource(name, parent=parent, user_data=zon)
-            self.root.user_data.zoneslist.append(name)
-            parent_dom = self.DS.get_resource(zon.domain)
-            parent_dom.user_data.zoneslist.append(name)
-            gparent_ent = self.DS.get_resource(zon.enterprise)
-            gparent_ent.user_data.zoneslist.append(name)
+            self.DS.get_writable_user_data('CMS').zoneslist.append(name)
+            self.DS.get_writable_user_data(zon.domain).zoneslist.append(name)
+            self.DS.get_writable_user_data(zon.enterprise).zoneslist.append(name)
 
     def check_user_subnets_in_zone(self, zone):
         num, offset = self.check_if_type_present(zone, 'Subnet')
@@ -289,13 +275,10 @@ class UserResourceData(object):
             sub.domain = gparent
             sub.enterprise = ggparent
             self.DS.insert_resource(name, parent=parent, user_data=sub)
-            self.root.user_data.subnetslist.append(name)
-            parent_zon = self.DS.get_resource(sub.zone)
-            parent_zon.user_data.subnetslist.append(name)
-            gparent_dom = self.DS.get_resource(sub.domain)
-            gparent_dom.user_data.subnetslist.append(name)
-            ggparent_ent = self.DS.get_resource(sub.enterprise)
-            ggparent_ent.user_data.subnetslist.append(name)
+            self.DS.get_writable_user_data('CMS').subnetslist.append(name)
+            self.DS.get_writable_user_data(sub.zone).subnetslist.append(name)
+            self.DS.get_writable_user_data(sub.domain).subnetslist.append(name)
+            self.DS.get_writable_user_data(sub.enterprise).subnetslist.append(name)
 
     def check_endpoints_in_l2domain(self, l2domain):
         num, offset = self.check_if_type_present(l2domain, 'EndPoint')
@@ -318,15 +301,11 @@ class UserResourceData(object):
             ep.domain = ggparent
             ep.enterprise = gggparent
             self.DS.insert_resource(name, parent=parent, user_data=ep)
-            self.root.user_data.endpointslist.append(name)
-            parent_subnet = self.DS.get_resource(ep.subnet)
-            parent_subnet.user_data.endpointslist.append(name)
-            gparent_zone = self.DS.get_resource(ep.zone)
-            gparent_zone.user_data.endpointslist.append(name)
-            ggparent_dom = self.DS.get_resource(ep.domain)
-            ggparent_dom.user_data.endpointslist.append(name)
-            gggparent_ent = self.DS.get_resource(ep.enterprise)
-            gggparent_ent.user_data.endpointslist.append(name)
+            self.DS.get_writable_user_data('CMS').endpointslist.append(name)
+            self.DS.get_writable_user_data(ep.subnet).endpointslist.append(name)
+            self.DS.get_writable_user_data(ep.zone).endpointslist.append(name)
+            self.DS.get_writable_user_data(ep.domain).endpointslist.append(name)
+            self.DS.get_writable_user_data(ep.enterprise).endpointslist.append(name)
 
     def populate_user_endpoint_in_l2dom_tree(self, parent, gparent, offset, **kwargs):
         number_of_endpoints = kwargs['endpPL2Dom']
@@ -336,11 +315,9 @@ class UserResourceData(object):
             ep.l2domain = parent
             ep.enterprise = gparent
             self.DS.insert_resource(name, parent=parent, user_data=ep)
-            self.root.user_data.endpointslist.append(name)
-            parent_l2dom = self.DS.get_resource(ep.l2domain)
-            parent_l2dom.user_data.endpointslist.append(name)
-            gparent_ent = self.DS.get_resource(ep.enterprise)
-            gparent_ent.user_data.endpointslist.append(name)
+            self.DS.get_writable_user_data('CMS').endpointslist.append(name)
+            self.DS.get_writable_user_data(ep.l2domain).endpointslist.append(name)
+            self.DS.get_writable_user_data(ep.enterprise).endpointslist.append(name)
 
     def trigger_populate_tree(self, dataStruct=None, **kwargs):
         self.DS = dataStruct if dataStruct else self.DS
@@ -0,0 +1,308 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Memory and throughput benchmark for the openstackData tree.
+#
+#    Builds trees shaped like the output of generate_resource_tree
+#    (enterprises, domains, zones, subnets and endpoints) and measures
+#    the tree operations on them:
+#
+#      python -m nuagetempest.lib.scale.tree_benchmark
+#      python -m nuagetempest.lib.scale.tree_benchmark -b build 100000
+#
+
+import argparse
+import gc
+import io
+import os
+import pickle
+import resource
+import sys
+import tempfile
+import time
+import uuid
+
+from nuagetempest.lib.openstackData import openstackData
+from nuagetempest.lib.tree import Tree
+
+SIZES = (100000, 1000000)
+
+# (kind, children per parent) below each enterprise, 10451 nodes each
+SHAPE = (('d', 10), ('z', 4), ('s', 10), ('ep', 25))
+# length of the chain of deep_tree()
+DEEP = 1000
+# nodes whose level is asked
+LEVEL_SAMPLE = 10000
+
+
+def scale_names(size, shape=SHAPE):
+    """Yield the (tag, parent tag) of size - 1 nodes below CMS, parents
+    first, named like generate_resource_tree names them.
+    """
+    count = 1
+    enterprise = 0
+    while count < size:
+        enterprise += 1
+        stack = [('e-%d' % enterprise, 'CMS', 0)]
+        while stack and count < size:
+            tag, parent, depth = stack.pop()
+            yield tag, parent
+            count += 1
+            if depth < len(shape):
+                kind, fanout = shape[depth]
+                stack.extend(('%s-%s-%d' % (tag, kind, i), tag, depth + 1)
+                             for i in range(fanout, 0, -1))
+
+
+def scale_tree(size, shape=SHAPE, os_data=False, indexed=True):
+    """Return an openstackData of size nodes, with an os_data dict and
+    a user_data dict holding the kind of the node each if os_data.
+    """
+    data = openstackData(indexed=indexed)
+    for tag, parent in scale_names(size, shape):
+        if os_data:
+            kind = 'e' if parent == 'CMS' else tag.split('-')[-2]
+            data.insert_resource(tag, parent, os_data={
+                'id': str(uuid.uuid4()), 'name': tag, 'tenant_id': 'admin'},
+                user_data={'type': kind})
+        else:
+            data.insert_resource(tag, parent)
+    return data
+
+
+def deep_tree(size, depth=DEEP):
+    """Return an openstackData of size nodes, a chain of depth nodes
+    below CMS with the other nodes as leaves spread along it.
+    """
+    data = openstackData()
+    parent = 'CMS'
+    leaves = max(size // depth - 1, 0)
+    count = 1
+    for i in range(depth):
+        if count >= size:
+            break
+        tag = 'c-%d' % i
+        data.insert_resource(tag, parent)
+        count += 1
+        for j in range(min(leaves, size - count)):
+            data.insert_resource('%s-l-%d' % (tag, j), tag)
+            count += 1
+        parent = tag
+    return data
+
+
+def rss():
+    """Return the resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except IOError:
+        # peak, not current, size on platforms without procfs
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return time.time() - start, result
+
+
+def bench_build(size):
+    gc.collect()
+    before = rss()
+    elapsed, data = timed(scale_tree, size)
+    gc.collect()
+    grown = rss() - before
+    node = data.get_resource('e-1')
+    return [('build', '%.2f s' % elapsed),
+            ('build rate', '%.0f nodes/s' % (size / elapsed)),
+            ('memory', '%.0f bytes/node' % (float(grown) / size)),
+            ('node size', '%d bytes' % (sys.getsizeof(node) +
+                                        sys.getsizeof(node.fpointer)))]
+
+
+def bench_contains(size):
+    data = scale_tree(size)
+    tags = [tag for tag, _ in scale_names(size)]
+    missing = ['%s-missing' % tag for tag in tags]
+    tree = data.resources
+    hit, _ = timed(lambda: [tag in tree for tag in tags])
+    miss, _ = timed(lambda: [tag in tree for tag in missing])
+    return [('contains hit', '%.0f lookups/s' % (len(tags) / hit)),
+            ('contains miss', '%.0f lookups/s' % (len(missing) / miss))]
+
+
+def bench_remove(size):
+    data = scale_tree(size)
+    # the last endpoints of every subnet, their parents have 25 children
+    leaves = [tag for tag, _ in scale_names(size)
+              if '-ep-' in tag and not tag.endswith('-ep-1')]
+    elapsed, _ = timed(lambda: [data.delete_resource(tag) for tag in leaves])
+    return [('remove leaves', '%.0f nodes/s' % (len(leaves) / elapsed))]
+
+
+def bench_expand(size):
+    tree = scale_tree(size).resources
+    results = []
+    for name, mode in (('depth', tree.DEPTH), ('width', tree.WIDTH),
+                       ('zigzag', tree.ZIGZAG)):
+        elapsed, count = timed(
+            lambda: sum(1 for _ in tree.expand_tree(mode=mode)))
+        results.append(('expand %s' % name, '%.0f nodes/s' % (
+            count / elapsed)))
+    # expand_tree() collects the nodes of the removed subtree
+    elapsed, count = timed(tree.remove_node, 'e-1')
+    results.append(('remove subtree', '%.0f nodes/s' % (count / elapsed)))
+    return results
+
+
+def bench_level(size):
+    results = []
+    for shape, data in (('wide', scale_tree(size)),
+                        ('deep', deep_tree(size))):
+        tree = data.resources
+        sample = list(tree.nodes)[:LEVEL_SAMPLE]
+        elapsed, _ = timed(lambda: [tree.level(nid) for nid in sample])
+        results.append(('%s level' % shape, '%.0f calls/s' % (
+            len(sample) / elapsed)))
+        elapsed, depth = timed(tree.depth)
+        results.append(('%s depth' % shape, '%.3f ms (%d)' % (
+            elapsed * 1000, depth)))
+        elapsed, count = timed(
+            lambda: sum(1 for _ in tree.paths_to_leaves()))
+        results.append(('%s paths' % shape, '%.0f paths/s' % (
+            count / elapsed)))
+    return results
+
+
+def bench_render(size):
+    tree = scale_tree(size).resources
+    elapsed, text = timed(lambda: str(tree))
+    results = [('str', '%.0f lines/s' % (size / elapsed))]
+    path = tempfile.mktemp(suffix='.txt')
+    try:
+        elapsed, _ = timed(tree.save2file, path)
+    finally:
+        os.remove(path)
+    results.append(('save2file', '%.0f lines/s' % (size / elapsed)))
+    writer = io.StringIO()
+    elapsed, _ = timed(lambda: tree.render(writer, max_depth=3,
+                                           max_children=5))
+    results.append(('render window', '%.3f ms, %d lines' % (
+        elapsed * 1000, writer.getvalue().count('\n'))))
+    return results
+
+
+def bench_json(size):
+    data = scale_tree(size, os_data=True)
+    tree = data.resources
+    path = tempfile.mktemp(suffix='.json')
+    results = []
+    try:
+        elapsed, _ = timed(tree.to_json)
+        results.append(('to_json', '%.2f s' % elapsed))
+        for name, lines in (('lines', True), ('nested', False)):
+            with io.open(path, 'w', encoding='utf-8') as f:
+                elapsed, _ = timed(tree.write_json, f, None, lines)
+            results.append(('write %s' % name, '%.2f s, %.1f MB' % (
+                elapsed, os.path.getsize(path) / 1e6)))
+            with io.open(path, encoding='utf-8') as f:
+                elapsed, loaded = timed(tree.read_json, f, lines)
+            results.append(('read %s' % name, '%.2f s, %d nodes' % (
+                elapsed, len(loaded))))
+            del loaded
+        with open(path, 'wb') as f:
+            elapsed, _ = timed(pickle.dump, tree, f, pickle.HIGHEST_PROTOCOL)
+        results.append(('pickle dump', '%.2f s, %.1f MB' % (
+            elapsed, os.path.getsize(path) / 1e6)))
+        with open(path, 'rb') as f:
+            elapsed, _ = timed(pickle.load, f)
+        results.append(('pickle load', '%.2f s' % elapsed))
+    finally:
+        os.remove(path)
+    return results
+
+
+def bench_index(size):
+    results = []
+    for name, indexed in (('indexed', True), ('scan', False)):
+        elapsed, data = timed(scale_tree, size, SHAPE, True, indexed)
+        results.append(('%s build' % name, '%.0f nodes/s' % (
+            size / elapsed)))
+        zones = data.get_resources_by_type('z')
+        elapsed, _ = timed(lambda: [
+            data.get_children_resources_by_type(zone.identifier, 's')
+            for zone in zones])
+        results.append(('%s children' % name, '%.0f queries/s' % (
+            len(zones) / elapsed)))
+        os_ids = [node.os_data['id'] for node in
+                  data.resources.all_nodes() if node.os_data][::size // 100]
+        elapsed, _ = timed(lambda: [data.get_resource_by_os_id(os_id)
+                                    for os_id in os_ids])
+        results.append(('%s os id' % name, '%.0f queries/s' % (
+            len(os_ids) / elapsed)))
+    return results
+
+
+def bench_snapshot(size):
+    data = scale_tree(size, os_data=True)
+    tree = data.resources
+    results = []
+    for name, take in (('deepcopy', lambda: Tree(tree, deep=True)),
+                       ('snapshot', tree.snapshot)):
+        gc.collect()
+        before = rss()
+        elapsed, copy = timed(take)
+        gc.collect()
+        results.append((name, '%.3f s, %.1f MB' % (
+            elapsed, (rss() - before) / 1e6)))
+        del copy
+    snapshot = data.snapshot()
+    # a test changing 1% of the resources of the expected state
+    tags = [tag for tag, _ in scale_names(size)][::100]
+    elapsed, _ = timed(lambda: [
+        data.update_resource(tag, os_data={'id': tag, 'name': tag})
+        for tag in tags])
+    results.append(('update shared', '%.0f nodes/s' % (len(tags) / elapsed)))
+    elapsed, _ = timed(lambda: [
+        data.update_resource(tag, os_data={'id': tag, 'name': tag})
+        for tag in tags])
+    results.append(('update owned', '%.0f nodes/s' % (len(tags) / elapsed)))
+    del snapshot
+    return results
+
+
+BENCHMARKS = {
+    'build': bench_build,
+    'contains': bench_contains,
+    'expand': bench_expand,
+    'index': bench_index,
+    'json': bench_json,
+    'level': bench_level,
+    'remove': bench_remove,
+    'render': bench_render,
+    'snapshot': bench_snapshot,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the openstackData tree at scale')
+    parser.add_argument('sizes', nargs='*', type=int, default=SIZES,
+                        help='number of nodes of the trees')
+    parser.add_argument('-b', '--benchmark', action='append',
+                        choices=sorted(BENCHMARKS),
+                        help='benchmarks to run, all by default')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        print('%d nodes' % size)
+        for name in args.benchmark or sorted(BENCHMARKS):
+            for metric, value in BENCHMARKS[name](size):
+                print('  %-16s %20s' % (metric, value))
+            gc.collect()
+
+
+if __name__ == '__main__':
+    main()
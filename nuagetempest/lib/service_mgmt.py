@@ -2,12 +2,12 @@
 # All Rights Reserved.
 #
 
-import time
 import urlparse
 from tempest import config
 from oslo_log import log as logging
 from tempest.lib.common import ssh as ssh
 from nuagetempest.lib.utils import constants as constants
+from nuagetempest.lib.utils import poller
 from tempest.lib import exceptions
 
 
@@ -55,16 +55,11 @@ class ServiceManager():
 
         return response
 
-    def wait_for_service_status(self, service):
-        start = time.time()
-        timeout = 30.0
-
-        while not self.is_service_running(service):
-            time.sleep(5)
-
-            if time.time() - start >= timeout:
-                message = "Timeout when waiting for service"
-                raise exceptions.TimeoutException(message)
+    def wait_for_service_status(self, service, timeout=60.0):
+        service_poller = poller.Poller(timeout=timeout, initial_delay=1,
+                                       exc_class=exceptions.TimeoutException)
+        service_poller.wait_until(lambda: self.is_service_ready(service),
+                                  description='service ' + service)
 
     def start_service(self, service):
         """Starts the service
@@ -87,8 +82,7 @@ class ServiceManager():
         pid = response.rstrip('\n')
         LOG.debug("Started service '" + service + "' with PID " + pid)
 
-        # TODO: test for successful start
-        time.sleep(3)
+        self.wait_for_service_status(service)
 
     def is_service_running(self, service):
         is_running = False
@@ -99,14 +93,25 @@ class ServiceManager():
 
         pids = response.split('\n')
         if len(response) > 0 and (len(pids) >= 1):
+            # having a PID is not enough, see is_service_ready()
             is_running = True
 
-            # TODO: having a PID is not enough, the service must be completely started!
-            # Replace sleep with something better.
-            time.sleep(2)
-
         return is_running
 
+    def is_service_ready(self, service):
+        """Return whether the service runs and, for neutron-server, whether
+        its API answers on the controller
+        """
+        if not self.is_service_running(service):
+            return False
+        if service != constants.NEUTRON_SERVICE:
+            return True
+        # curl reports 000 while the port is not listening yet
+        response = self.execute("curl -s -o /dev/null -w '%{http_code}' "
+                                "http://127.0.0.1:" +
+                                str(constants.NEUTRON_API_PORT) + "/ || true")
+        return response.strip() == '200'
+
     def stop_service(self, service):
         response = self.execute("sudo ps ax | grep '" + service + "' | grep -v grep | awk '{print $1}'")
         response = response.rstrip('\n')
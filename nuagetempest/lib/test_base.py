@@ -1,6 +1,6 @@
-import time
 import re
 import logging
+from nuagetempest.lib.utils import poller
 from nuagetempest.tests import conf
 
 LOG = logging.getLogger(__name__)
@@ -12,12 +12,13 @@ def get_external_id(id):
 def get_filter_str(key, value):
     return key + '  == "{}"'.format(value)
 
-def poll_for_vm_boot(vrs, vm_ip, max_tries):
-    vrs_data = vrs.vmportshow()
-    for vm in vrs_data:
-        for each_try in (0, max_tries):
-            if vm['ip'] != '0':
-                break
-    if vm['ip'] == vm_ip:
-            return vm
-    return None 
+def poll_for_vm_boot(vrs, vm_ip, max_tries, timeout=60):
+    """Wait until the VRS reports a port for vm_ip, None if it never does"""
+    def vm_port():
+        for vm in vrs.vmportshow():
+            if vm['ip'] == vm_ip:
+                return vm
+        return None
+    vm_poller = poller.Poller(timeout=timeout, max_attempts=max_tries)
+    return vm_poller.wait_for_appear(vm_port, description='vrs vm port',
+                                     default=None)
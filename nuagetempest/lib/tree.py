@@ -6,17 +6,15 @@
 """
 from __future__ import print_function
 from __future__ import unicode_literals
+import io
 import sys
 import json
-from copy import deepcopy
+from collections import deque
+import copy
 try:
     from .node import Node
 except ImportError:
     from node import Node
-try:
-    from StringIO import StringIO as BytesIO
-except ImportError:
-    from io import BytesIO
 
 
 
@@ -49,6 +47,14 @@ class LinkPastRootNodeError(Exception):
 class InvalidLevelNumber(Exception):
     pass
 
+
+class LoopError(Exception):
+    """
+    Exception throwed if trying to move a node below one of its own
+    successors.
+    """
+    pass
+
 def python_2_unicode_compatible(klass):
     """
     (slightly modified from :
@@ -69,6 +75,16 @@ def python_2_unicode_compatible(klass):
         klass.__str__ = lambda self: self.__unicode__().encode('utf-8')
     return klass
 
+class _Ownership(object):
+    """Identifiers of the nodes of a tree not shared with a snapshot,
+    shared by the shallow copies of that tree.
+    """
+
+    def __init__(self, nids=None):
+        #: set, None if every node is owned (no snapshot was taken)
+        self.nids = nids
+
+
 @python_2_unicode_compatible
 class Tree(object):
     """Tree objects are made of Node(s) stored in _nodes dictionary."""
@@ -76,12 +92,21 @@ class Tree(object):
     #: ROOT, DEPTH, WIDTH, ZIGZAG constants :
     (ROOT, DEPTH, WIDTH, ZIGZAG) = list(range(4))
 
+    #: line_type: (vertical line, branch, last branch)
+    LINE_TYPES = {
+        'ascii': ('|', '|-- ', '+-- '),
+        'ascii-ex': ('\u2502', '\u251c\u2500\u2500 ', '\u2514\u2500\u2500 '),
+        'ascii-exr': ('\u2502', '\u251c\u2500\u2500 ', '\u2570\u2500\u2500 '),
+        'ascii-em': ('\u2551', '\u2560\u2550\u2550 ', '\u255a\u2550\u2550 '),
+        'ascii-emv': ('\u2551', '\u255f\u2500\u2500 ', '\u2559\u2500\u2500 '),
+        'ascii-emh': ('\u2502', '\u255e\u2550\u2550 ', '\u2558\u2550\u2550 ')}
+
+    #: Node attributes saved by write_json() when they are not None
+    DATA_FIELDS = ('os_data', 'vsd_data', 'vsc_data', 'vrs_data', 'user_data')
+
     def __contains__(self, identifier):
-        """Return a list of the nodes'identifiers matching the
-        identifier argument.
-        """
-        return [node for node in self._nodes
-                if node == identifier]
+        """Return True if identifier is the identifier of a node"""
+        return identifier in self._nodes
 
     def __init__(self, tree=None, deep=False):
         """Initiate a new tree or copy another tree with a shallow or
@@ -94,14 +119,28 @@ class Tree(object):
         #: identifier of the root node
         self.root = None
 
+        #: dictionary, identifier: level of the node
+        self._levels = {}
+        #: list, number of nodes at each level
+        self._level_sizes = []
+
+        #: nodes not shared with a snapshot, see snapshot()
+        self._ownership = _Ownership()
+
         if tree is not None:
             self.root = tree.root
 
             if deep:
                 for nid in tree._nodes:
-                    self._nodes[nid] = deepcopy(tree._nodes[nid])
+                    self._nodes[nid] = copy.deepcopy(tree._nodes[nid])
+                self._levels = dict(tree._levels)
+                self._level_sizes = list(tree._level_sizes)
             else:
                 self._nodes = tree._nodes
+                self._levels = tree._levels
+                self._level_sizes = tree._level_sizes
+                # both trees change the same nodes, and own them alike
+                self._ownership = tree._ownership
 
     def __getitem__(self, key):
         """Return _nodes[key]"""
@@ -117,22 +156,19 @@ class Tree(object):
     def __setitem__(self, key, item):
         """Set _nodes[key]"""
         self._nodes.update({key: item})
+        self.__adopt(key)
 
     def __str__(self):
-        self.reader = ""
+        reader = io.StringIO()
+        self.render(reader)
+        return reader.getvalue()
 
-        def write(line):
-            self.reader += line.decode('utf-8') + "\n"
-
-        self.__print_backend(func=write)
-        return self.reader
-
-    def __print_backend(self, nid=None, level=ROOT, idhidden=True, filter=None,
-                       key=None, reverse=False, line_type='ascii-ex',
-                       func=print, iflast=[]):
+    def __render_lines(self, nid=None, idhidden=True, filter=None, key=None,
+                       reverse=False, line_type='ascii-ex', max_depth=None,
+                       max_children=None):
         """
-        Another implementation of printing tree using Stack
-        Print tree structure in hierarchy style.
+        Python generator of the lines printing the tree structure in
+        hierarchy style.
 
         For example:
             Root
@@ -144,65 +180,119 @@ class Tree(object):
             |___ C03
             |    |___ C31
 
-        A more elegant way to achieve this function using Stack
-        structure, for constructing the Nodes Stack push and pop nodes
-        with additional level info.
+        Nodes are pushed on a stack with the leading characters of their
+        line, so huge trees are neither recursed into nor held in memory.
 
         UPDATE: the @key @reverse is present to sort node at each
         level.
-        """
-        line_types = \
-        {'ascii': ('|', '|-- ', '+-- '),
-         'ascii-ex': ('\u2502', '\u251c\u2500\u2500 ', '\u2514\u2500\u2500 '),
-         'ascii-exr': ('\u2502', '\u251c\u2500\u2500 ', '\u2570\u2500\u2500 '),
-         'ascii-em': ('\u2551', '\u2560\u2550\u2550 ', '\u255a\u2550\u2550 '),
-         'ascii-emv': ('\u2551', '\u255f\u2500\u2500 ', '\u2559\u2500\u2500 '),
-         'ascii-emh': ('\u2502', '\u255e\u2550\u2550 ', '\u2558\u2550\u2550 ')}
-        DT_VLINE, DT_LINE_BOX, DT_LINE_COR = line_types[line_type]
 
-        leading = ''
-        lasting = DT_LINE_BOX
+        UPDATE: @max_depth limits the levels printed below @nid and
+        @max_children the children printed per node, the others being
+        counted on a last line.
+        """
+        DT_VLINE, DT_LINE_BOX, DT_LINE_COR = self.LINE_TYPES[line_type]
 
         nid = self.root if (nid is None) else nid
         if not self.contains(nid):
             raise NodeIDAbsentError("Node '%s' is not in the tree" % nid)
 
-        label = ('{0}'.format(self[nid].tag))\
-                 if idhidden \
-                    else ('{0}[{1}]'.format(
-                            self[nid].tag,
-                            self[nid].identifier))
-
         filter = (self.__real_true) if (filter is None) else filter
+        key = (lambda x: x) if (key is None) else key
+
+        # (nid, leading, lasting, level), nid is None for the line
+        # counting the children left out
+        stack = [(nid, '', '', 0)]
+        while stack:
+            nid, leading, lasting, level = stack.pop()
+            if nid is None:
+                yield leading + lasting
+                continue
+            node = self[nid]
+            label = ('{0}'.format(node.tag)) if idhidden \
+                else ('{0}[{1}]'.format(node.tag, node.identifier))
+            yield '{0}{1}{2}'.format(leading, lasting, label)
+
+            if not (filter(node) and node.expanded) or level == max_depth:
+                continue
+            children = [self[i] for i in node.fpointer if filter(self[i])]
+            children.sort(key=key, reverse=reverse)
+            omitted = 0
+            if max_children is not None and len(children) > max_children:
+                omitted = len(children) - max_children
+                children = children[:max_children]
+
+            if level == 0:
+                leading = ''
+            else:
+                leading += ' ' * 4 if lasting == DT_LINE_COR \
+                    else DT_VLINE + ' ' * 3
+            last = len(children) - 1
+            lines = [(child.identifier, leading,
+                      DT_LINE_COR if i == last and not omitted
+                      else DT_LINE_BOX, level + 1)
+                     for i, child in enumerate(children)]
+            if omitted:
+                lines.append((None, leading, '{0}... {1} more'.format(
+                    DT_LINE_COR, omitted), level + 1))
+            lines.reverse()
+            stack.extend(lines)
+
+    def __set_level(self, nid, level):
+        """Record level as the level of nid"""
+        self.__drop_level(nid)
+        self._levels[nid] = level
+        while len(self._level_sizes) <= level:
+            self._level_sizes.append(0)
+        self._level_sizes[level] += 1
+
+    def __drop_level(self, nid):
+        """Forget the level of nid"""
+        level = self._levels.pop(nid, None)
+        if level is None:
+            return
+        self._level_sizes[level] -= 1
+        while self._level_sizes and not self._level_sizes[-1]:
+            self._level_sizes.pop()
+
+    def __set_levels(self, nid, level):
+        """Record the levels of the subtree of nid, nid being at level"""
+        stack = [(nid, level)]
+        while stack:
+            nid, level = stack.pop()
+            self.__set_level(nid, level)
+            stack.extend((child, level + 1) for child in self[nid].fpointer)
+
+    def __own(self, nid):
+        """Return self[nid] to be changed, copied first if it is shared
+        with a snapshot.
+        """
+        node = self[nid]
+        owned = self._ownership.nids
+        if owned is None or nid in owned:
+            return node
+        node = self._nodes[nid] = copy.copy(node)
+        owned.add(nid)
+        return node
 
-        if level == self.ROOT:
-            func(label.encode('utf8'))
-        else:
-            leading = ''.join(map(lambda x: DT_VLINE + ' ' * 3
-                                  if not x else ' ' * 4, iflast[0:-1]))
-            lasting = DT_LINE_COR if iflast[-1] else DT_LINE_BOX
-            func('{0}{1}{2}'.format(leading, lasting, label).encode('utf-8'))
+    def __adopt(self, nid):
+        """Mark nid, new to this tree, as not shared"""
+        if self._ownership.nids is not None:
+            self._ownership.nids.add(nid)
 
-        if filter(self[nid]) and self[nid].expanded:
-            queue = [self[i] for i in self[nid].fpointer if filter(self[i])]
-            key = (lambda x: x) if (key is None) else key
-            queue.sort(key=key, reverse=reverse)
-            level += 1
-            for element in queue:
-                iflast.append(queue.index(element) == len(queue)-1)
-                self.__print_backend(element.identifier, level, idhidden,
-                    filter, key, reverse, line_type, func, iflast)
-                iflast.pop()
+    def __disown(self, nid):
+        """Forget nid, removed from this tree"""
+        if self._ownership.nids is not None:
+            self._ownership.nids.discard(nid)
 
     def __update_bpointer(self, nid, parent_id):
         """set self[nid].bpointer"""
-        self[nid].update_bpointer(parent_id)
+        self.__own(nid).update_bpointer(parent_id)
 
     def __update_fpointer(self, nid, child_id, mode):
         if nid is None:
             return
         else:
-            self[nid].update_fpointer(child_id, mode)
+            self.__own(nid).update_fpointer(child_id, mode)
 
     def __real_true(self, p):
         return True
@@ -252,8 +342,11 @@ class Tree(object):
                                     "is not in the tree" % parent)
 
         self._nodes.update({node.identifier: node})
+        self.__adopt(node.identifier)
         self.__update_fpointer(parent, node.identifier, Node.ADD)
         self.__update_bpointer(node.identifier, parent)
+        self.__set_level(node.identifier,
+                         0 if parent is None else self._levels[parent] + 1)
 
     def all_nodes(self):
         """Return all nodes in a list"""
@@ -268,7 +361,7 @@ class Tree(object):
 
     def contains(self, nid):
         """Check if the tree contains node of given id"""
-        return True if nid in self._nodes else False
+        return nid in self._nodes
 
     def create_node(self, tag=None, identifier=None, parent=None, os_data=None,
                     vsd_data=None, vsc_data=None, vrs_data=None, user_data=None):
@@ -282,7 +375,7 @@ class Tree(object):
     def update_node(self, nid, os_data=None, vsd_data=None,
                     vsc_data=None, vrs_data=None, user_data=None):
         """Update data  for a given @parent node."""
-        node = self.get_node(nid)
+        node = self.__own(nid) if self.contains(nid) else None
         if node:
             if os_data:
                 node.os_data = os_data
@@ -309,10 +402,7 @@ class Tree(object):
         ret = 0
         if node is None:
             # Get maximum level of this tree
-            leaves = self.leaves()
-            for leave in leaves:
-                level = self.level(leave.identifier)
-                ret = level if level >= ret else ret
+            ret = max(len(self._level_sizes) - 1, 0)
         else:
             # Get level of the given node
             if not isinstance(node, Node):
@@ -336,45 +426,66 @@ class Tree(object):
 
         UPDATE: the @key and @reverse are present to sort nodes at each
         level.
+
+        UPDATE: nodes are kept in a deque (WIDTH, ZIGZAG) or a stack
+        (DEPTH) instead of lists rebuilt at every step, traversing is
+        linear in the number of nodes.
         """
         nid = self.root if (nid is None) else nid
         if not self.contains(nid):
             raise NodeIDAbsentError("Node '%s' is not in the tree" % nid)
 
         filter = self.__real_true if (filter is None) else filter
-        if filter(self[nid]):
-            yield nid
-            queue = [self[i] for i in self[nid].fpointer if filter(self[i])]
-            if mode in [self.DEPTH, self.WIDTH]:
-                queue.sort(key=key, reverse=reverse)
-                while queue:
-                    yield queue[0].identifier
-                    expansion = [self[i] for i in queue[0].fpointer
-                                 if filter(self[i])]
-                    expansion.sort(key=key, reverse=reverse)
-                    if mode is self.DEPTH:
-                        queue = expansion + queue[1:]  # depth-first
-                    elif mode is self.WIDTH:
-                        queue = queue[1:] + expansion  # width-first
-
-            elif mode is self.ZIGZAG:
-                # Suggested by Ilya Kuprik (ilya-spy@ynadex.ru).
-                stack_fw = []
-                queue.reverse()
-                stack = stack_bw = queue
-                direction = False
-                while stack:
-                    expansion = [self[i] for i in stack[0].fpointer
-                                 if filter(self[i])]
-                    yield stack.pop(0).identifier
-                    if direction:
-                        expansion.reverse()
-                        stack_bw = expansion + stack_bw
-                    else:
-                        stack_fw = expansion + stack_fw
-                    if not stack:
-                        direction = not direction
-                        stack = stack_fw if direction else stack_bw
+        if not filter(self[nid]):
+            return
+        yield nid
+        if mode is self.DEPTH:
+            # reversed, the next node is at the end of the stack
+            stack = self.__expansion(self[nid], filter, key, reverse)
+            stack.reverse()
+            while stack:
+                node = stack.pop()
+                yield node.identifier
+                expansion = self.__expansion(node, filter, key, reverse)
+                expansion.reverse()
+                stack.extend(expansion)
+
+        elif mode is self.WIDTH:
+            queue = deque(self.__expansion(self[nid], filter, key, reverse))
+            while queue:
+                node = queue.popleft()
+                yield node.identifier
+                queue.extend(self.__expansion(node, filter, key, reverse))
+
+        elif mode is self.ZIGZAG:
+            # Suggested by Ilya Kuprik (ilya-spy@ynadex.ru).
+            # Levels are alternately walked right to left and left to right.
+            stack = deque(reversed(self.__expansion(self[nid], filter,
+                                                    sort=False)))
+            next_level = deque()
+            direction = False
+            while stack:
+                node = stack.popleft()
+                expansion = self.__expansion(node, filter, sort=False)
+                yield node.identifier
+                # extendleft() prepends in reverse order
+                if direction:
+                    next_level.extendleft(expansion)
+                else:
+                    next_level.extendleft(reversed(expansion))
+                if not stack:
+                    direction = not direction
+                    stack, next_level = next_level, deque()
+
+    def __expansion(self, node, filter, key=None, reverse=False,
+                    sort=True):
+        """Return the children (Node) of node passing filter, sorted by
+        @key and @reverse if @sort.
+        """
+        expansion = [self[i] for i in node.fpointer if filter(self[i])]
+        if sort:
+            expansion.sort(key=key, reverse=reverse)
+        return expansion
 
     def get_node(self, nid):
         """Return the node with nid. None returned if nid not exists."""
@@ -419,7 +530,12 @@ class Tree(object):
 
         Update: @filter params is added to calculate level passing
         exclusive nodes.
+
+        Update: levels are indexed as nodes are added, moved and removed,
+        the branch is only traversed with a @filter.
         """
+        if filter is None and nid in self._levels:
+            return self._levels[nid]
         return len([n for n in self.rsearch(nid, filter)])-1
 
     def link_past_node(self, nid):
@@ -435,15 +551,19 @@ class Tree(object):
             raise LinkPastRootNodeError("Cannot link past the root node, "
                                         "delete it with remove_node()")
         # Get the parent of the node we are linking past
-        parent = self[self[nid].bpointer]
+        parent = self.__own(self[nid].bpointer)
         # Set the children of the node to the parent
+        level = self.level(nid)
         for child in self[nid].fpointer:
-            self[child].update_bpointer(parent.identifier)
+            self.__update_bpointer(child, parent.identifier)
+            self.__set_levels(child, level)
         # Link the children to the parent
-        parent.fpointer += self[nid].fpointer
+        parent.fpointer.extend(self[nid].fpointer)
         # Delete the node
         parent.update_fpointer(nid, mode=parent.DELETE)
         del self._nodes[nid]
+        self.__drop_level(nid)
+        self.__disown(nid)
 
     def move_node(self, source, destination):
         """
@@ -452,11 +572,15 @@ class Tree(object):
         """
         if not self.contains(source) or not self.contains(destination):
             raise NodeIDAbsentError
+        if source in self.rsearch(destination):
+            raise LoopError("Can't move node '%s' below its successor "
+                            "'%s'" % (source, destination))
 
         parent = self[source].bpointer
         self.__update_fpointer(parent, source, Node.DELETE)
         self.__update_fpointer(destination, source, Node.ADD)
         self.__update_bpointer(source, destination)
+        self.__set_levels(source, self.level(destination) + 1)
 
     @property
     def nodes(self):
@@ -480,6 +604,9 @@ class Tree(object):
         of new tree to given node (nid).
 
         Update: add @deepcopy of pasted tree.
+
+        Without @deepcopy, the nodes are shared with @new_tree. They are
+        copied before being changed by this tree if it has a snapshot.
         """
         assert isinstance(new_tree, Tree)
         if nid is None:
@@ -494,18 +621,21 @@ class Tree(object):
             raise ValueError('Duplicated nodes %s exists.' % list(set_joint))
 
         if deepcopy:
-            for node in new_tree._nodes:
-                self._nodes.update({node.identifier: deepcopy(node)})
+            for pasted, node in new_tree._nodes.items():
+                self._nodes.update({pasted: copy.deepcopy(node)})
+                self.__adopt(pasted)
         else:
             self._nodes.update(new_tree._nodes)
         self.__update_fpointer(nid, new_tree.root, Node.ADD)
         self.__update_bpointer(new_tree.root, nid)
+        self.__set_levels(new_tree.root, self.level(nid) + 1)
 
     def paths_to_leaves(self):
         """
         Use this function to get the identifiers allowing to go from the root
         nodes to each leaf.
-        Return a list of list of identifiers, root being not omitted.
+        Python generator of the lists of identifiers, root being not
+        omitted, in depth first order.
 
         For example :
             Harry
@@ -518,17 +648,61 @@ class Tree(object):
             |    |___ Mark
 
         expected result :
-        [['harry', 'jane', 'diane', 'mary'],
-         ['harry', 'jane', 'mark'],
-         ['harry', 'jane', 'diane', 'george', 'jill'],
-         ['harry', 'bill']]
-        """
-        res = []
+        ['harry', 'bill']
+        ['harry', 'jane', 'diane', 'george', 'jill']
+        ['harry', 'jane', 'diane', 'mary']
+        ['harry', 'jane', 'mark']
 
-        for leaf in self.leaves():
-            res.append([nid for nid in self.rsearch(leaf.identifier)][::-1])
-
-        return res
+        All the paths come from one traversal, the branch to the current
+        node being shared by the paths below it.
+        """
+        if self.root is None:
+            return
+        path = []
+        stack = [(self.root, 0)]
+        while stack:
+            nid, level = stack.pop()
+            del path[level:]
+            path.append(nid)
+            fpointer = self[nid].fpointer
+            if fpointer:
+                stack.extend((child, level + 1)
+                             for child in reversed(fpointer))
+            else:
+                yield list(path)
+
+    @classmethod
+    def read_json(cls, reader, lines=True):
+        """
+        Return a new tree of the nodes written by write_json() to
+        @reader, in one pass.
+
+        JSON Lines are read line by line. A nested document is loaded
+        first, by a recursive decoder: trees deeper than about 1000
+        levels are to be saved as JSON Lines.
+        """
+        tree = cls()
+        if lines:
+            for line in reader:
+                if line.strip():
+                    item = json.loads(line)
+                    tree.__add_json(item, item.get('parent'))
+            return tree
+
+        stack = [(json.load(reader), None)]
+        while stack:
+            item, parent = stack.pop()
+            tree.__add_json(item, parent)
+            stack.extend((child, item['identifier'])
+                         for child in reversed(item.get('children', [])))
+        return tree
+
+    def __add_json(self, item, parent):
+        node = Node(tag=item['tag'], identifier=item['identifier'],
+                    expanded=item.get('expanded', True))
+        for field in self.DATA_FIELDS:
+            setattr(node, field, item.get(field))
+        self.add_node(node, parent)
 
     def remove_node(self, identifier):
         """
@@ -555,6 +729,8 @@ class Tree(object):
         cnt = len(removed)
         for id in removed:
             del self._nodes[id]
+            self.__drop_level(id)
+            self.__disown(id)
         # Update its parent info
         self.__update_fpointer(parent, identifier, Node.DELETE)
         return cnt
@@ -585,12 +761,20 @@ class Tree(object):
         st.root = nid
 
         parent = self[nid].bpointer
-        self[nid].bpointer = None  # reset root parent for the new tree
+        self.__own(nid).bpointer = None  # reset root parent for the new tree
         removed = []
         for id in self.expand_tree(nid):
             removed.append(id)
+        base = self.level(nid)
+        owned = self._ownership.nids
+        if owned is not None:
+            # the nodes shared with a snapshot stay shared
+            st._ownership.nids = set(id for id in removed if id in owned)
         for id in removed:
             st._nodes.update({id: self._nodes.pop(id)})
+            st.__set_level(id, self.level(id) - base)
+            self.__drop_level(id)
+            self.__disown(id)
         # Update its parent info
         self.__update_fpointer(parent, nid, Node.DELETE)
         return st
@@ -615,28 +799,33 @@ class Tree(object):
             # subtree() hasn't update the bpointer
             current = self[current].bpointer if self.root != current else None
 
-    def save2file(self, filename, nid=None, level=ROOT, idhidden=True,
-                  filter=None, key=None, reverse=False, line_type='ascii-ex'):
-        """Update 20/05/13: Save tree into file for offline analysis"""
-        def _write_line(line, f):
-            f.write(line + b'\n')
+    def render(self, writer, nid=None, idhidden=True, filter=None, key=None,
+               reverse=False, line_type='ascii-ex', max_depth=None,
+               max_children=None):
+        """
+        Write the tree structure, line by line, to @writer, any object
+        with a write() method taking text.
 
-        handler = lambda x: _write_line(x, open(filename, 'ab'))
+        See __render_lines() for @max_depth and @max_children.
+        """
+        for line in self.__render_lines(nid, idhidden, filter, key, reverse,
+                                        line_type, max_depth, max_children):
+            writer.write(line + '\n')
 
-        self.__print_backend(nid, level, idhidden, filter,
-            key, reverse, line_type, func=handler)
+    def save2file(self, filename, nid=None, level=ROOT, idhidden=True,
+                  filter=None, key=None, reverse=False, line_type='ascii-ex',
+                  max_depth=None, max_children=None):
+        """Update 20/05/13: Save tree into file for offline analysis"""
+        with io.open(filename, 'a', encoding='utf-8') as f:
+            self.render(f, nid, idhidden, filter, key, reverse, line_type,
+                        max_depth, max_children)
 
     def show(self, nid=None, level=ROOT, idhidden=True, filter=None,
-             key=None, reverse=False, line_type='ascii-ex'):
-        self.reader = ""
-
-        def write(line):
-            self.reader += line.decode('utf-8') + "\n"
-
-        self.__print_backend(nid, level, idhidden, filter,
-            key, reverse, line_type, func=write)
-
-        print(self.reader)
+             key=None, reverse=False, line_type='ascii-ex', max_depth=None,
+             max_children=None):
+        self.render(sys.stdout, nid, idhidden, filter, key, reverse,
+                    line_type, max_depth, max_children)
+        sys.stdout.write('\n')
 
     def siblings(self, nid):
         """
@@ -663,7 +852,35 @@ class Tree(object):
 
         Otherwise, InvalidLevelNumber exception will be raised.
         """
-        return len(self._nodes)
+        if level is None:
+            return len(self._nodes)
+        if not 0 <= level < len(self._level_sizes):
+            raise InvalidLevelNumber("Level %s is not in [0, %d]" % (
+                level, self.depth()))
+        return self._level_sizes[level]
+
+    def snapshot(self):
+        """
+        Return a copy of this tree sharing its nodes, and their data,
+        with this tree: O(n) to take, against a deep copy of every node
+        and data for Tree(tree, deep=True).
+
+        Both trees copy a shared node, not its data, the first time they
+        change it: add_node, update_node, move_node, paste,
+        link_past_node, remove_node and remove_subtree never change the
+        other tree. Data and nodes changed in place, e.g.
+        tree[nid].os_data['name'] = name, are changed in both trees:
+        replace the data with update_node instead.
+        """
+        st = Tree()
+        st.root = self.root
+        st._nodes = dict(self._nodes)
+        st._levels = dict(self._levels)
+        st._level_sizes = list(self._level_sizes)
+        # every node is shared now, the trees own none
+        self._ownership.nids = set()
+        st._ownership.nids = set()
+        return st
 
     def subtree(self, nid):
         """
@@ -685,13 +902,65 @@ class Tree(object):
             raise NodeIDAbsentError("Node '%s' is not in the tree" % nid)
 
         st.root = nid
+        base = self.level(nid)
         for node_n in self.expand_tree(nid):
             st._nodes.update({self[node_n].identifier: self[node_n]})
+            st.__set_level(node_n, self.level(node_n) - base)
         return st
 
     def to_json(self, with_data=False, sort=True, reverse=False):
         """Return the json string corresponding to self"""
         return json.dumps(self.to_dict(with_data=with_data, sort=sort, reverse=reverse))
 
+    def write_json(self, writer, nid=None, lines=True, default=None):
+        """
+        Write the subtree of @nid to @writer, any object with a write()
+        method taking text, for read_json() to load it back.
+
+        With @lines, one JSON object per node (tag, identifier, parent
+        and the DATA_FIELDS set), parents first. Otherwise one nested
+        JSON object, the children of a node in its 'children' list.
+        Children keep their order. Nodes are encoded and written one by
+        one, never recursed into.
+
+        @default is given to json.dumps() to encode data that is not
+        JSON, e.g. lambda obj: obj.__dict__ for user_data objects.
+        """
+        nid = self.root if (nid is None) else nid
+        if not self.contains(nid):
+            raise NodeIDAbsentError("Node '%s' is not in the tree" % nid)
+
+        # (nid, separator), nid is None to close the children of a node
+        top = nid
+        stack = [(nid, '')]
+        while stack:
+            nid, separator = stack.pop()
+            if nid is None:
+                writer.write(']}')
+                continue
+            node = self[nid]
+            item = {'tag': node.tag, 'identifier': node.identifier}
+            if not node.expanded:
+                item['expanded'] = False
+            for field in self.DATA_FIELDS:
+                value = getattr(node, field)
+                if value is not None:
+                    item[field] = value
+            if lines:
+                if nid != top:
+                    item['parent'] = node.bpointer
+                writer.write(json.dumps(item, default=default) + '\n')
+                stack.extend((child, '') for child in
+                             reversed(node.fpointer))
+            elif node.fpointer:
+                # the object is closed after its children
+                writer.write(separator + json.dumps(item, default=default)[:-1]
+                             + ', "children": [')
+                stack.append((None, ''))
+                stack.extend((child, ', ' if i else '') for i, child in
+                             reversed(list(enumerate(node.fpointer))))
+            else:
+                writer.write(separator + json.dumps(item, default=default))
+
 if __name__ == '__main__':
     pass
@@ -0,0 +1,161 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+
+import collections
+import threading
+import time
+
+
+class TTLCache(object):
+    """Thread-safe LRU cache whose entries expire after ttl seconds.
+
+    A ttl of None keeps entries until they are evicted or invalidated.
+    A value fetched while a matching invalidate() ran is stale: reserve()
+    the key before fetching it and pass the token to set(), which then
+    drops the value if the key was invalidated in between.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = collections.OrderedDict()
+        # key -> [reservations, generation] of the keys being fetched
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires is not None and expires <= self._timer():
+                self.misses += 1
+                return default
+            # re-insert as most recently used
+            self._data[key] = (expires, value)
+            self.hits += 1
+            return value
+
+    def reserve(self, key):
+        """Return the token of a fetch of key, see set() and release()"""
+        with self._lock:
+            pending = self._pending.setdefault(key, [0, 0])
+            pending[0] += 1
+            return pending[1]
+
+    def _release(self, key):
+        pending = self._pending[key]
+        pending[0] -= 1
+        if not pending[0]:
+            del self._pending[key]
+        return pending[1]
+
+    def release(self, key):
+        """End a reserved fetch of key that stores nothing"""
+        with self._lock:
+            self._release(key)
+
+    def set(self, key, value, token=None):
+        """Store value, unless key was invalidated since reserve()"""
+        expires = self._timer() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if token is not None and self._release(key) != token:
+                return False
+            self._data.pop(key, None)
+            self._data[key] = (expires, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, predicate):
+        """Drop every entry whose key matches predicate(key)"""
+        with self._lock:
+            for key, pending in self._pending.items():
+                if predicate(key):
+                    pending[1] += 1
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'invalidations': self.invalidations,
+                    'size': len(self._data)}
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Merge concurrent calls for the same key into a single call.
+
+    The first caller of a key runs the function; callers arriving while
+    it is in flight wait for it and share its result or exception, unless
+    the key was forgotten in between.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return (result, shared), shared being True for waiters"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def forget(self, predicate):
+        """Make callers of the keys matching predicate(key) start anew.
+
+        Calls in flight keep running for the callers already waiting.
+        """
+        with self._lock:
+            for key in [key for key in self._calls if predicate(key)]:
+                del self._calls[key]
@@ -0,0 +1,270 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Record VSD REST traffic to a cassette and replay it without a VSD.
+#
+#    A cassette holds one JSON document per line and interaction: the
+#    method, path, filter/paging headers and a digest of the request body,
+#    followed by the response status, reason, headers and body. Cassettes
+#    named *.gz are gzip compressed.
+#
+#    Recording appends to the cassette, so the workers of a parallel run
+#    can share one: each flushes whole lines under an exclusive flock.
+#    Remove an old cassette before recording a new one. Cassettes are
+#    only readable by their owner and hold no APIKey: those of the
+#    authentication responses are redacted, replay does not need them.
+#
+#      rest = restproxy.RESTProxyServer(...)
+#      rest.use_cassette(get_cassette('run.jsonl.gz', REPLAY, LENIENT))
+#
+#    In strict mode a request must match a recorded one exactly, and every
+#    recording is served once, in order. Lenient matching ignores IDs in
+#    the path, query strings, filter values and request bodies, and keeps
+#    serving the last recording of a request once its recordings are used
+#    up; this lets a suite that created objects with other IDs replay.
+#
+
+import atexit
+import collections
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+from nuagetempest.lib.utils import metrics
+from nuagetempest.lib.utils import restproxy
+
+RECORD = 'record'
+REPLAY = 'replay'
+STRICT = 'strict'
+LENIENT = 'lenient'
+
+# lower-cased request headers that take part in matching
+MATCH_HEADERS = ('x-nuage-filter', 'x-nuage-filtertype', 'x-nuage-page',
+                 'x-nuage-pagesize', 'x-nuage-orderby')
+# lower-cased response headers worth recording
+RECORD_HEADERS = ('content-type', 'x-nuage-count', 'x-nuage-page',
+                  'x-nuage-pagesize', 'x-nuage-orderby')
+# recorded lines buffered before they are appended to the cassette
+FLUSH_LINES = 100
+# recorded in place of the APIKeys of authentication responses
+REDACTED = 'REDACTED'
+
+
+class CassetteError(restproxy.RESTProxyBaseException):
+    message = "%(reason)s"
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return open(path, mode)
+
+
+def _body_digest(body):
+    if body in (None, '', '""', 'null'):
+        return None
+    return hashlib.sha1(body).hexdigest()
+
+
+def _redact(respstr):
+    """Return respstr without the APIKeys of an authentication response"""
+    if '"APIKey"' not in respstr:
+        return respstr
+    try:
+        data = json.loads(respstr)
+    except ValueError:
+        return respstr
+    for obj in data if isinstance(data, list) else [data]:
+        if isinstance(obj, dict) and 'APIKey' in obj:
+            obj['APIKey'] = REDACTED
+    return json.dumps(data)
+
+
+class CassetteResponse(object):
+    """What the REST proxy reads from an httplib response"""
+    will_close = False
+
+    def __init__(self, status, reason, headers):
+        self.status = status
+        self.reason = reason
+        self._headers = headers
+
+    def getheaders(self):
+        return self._headers.items()
+
+
+class Cassette(object):
+
+    def __init__(self, path, mode=REPLAY, match=STRICT):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError('Unknown cassette mode %s' % mode)
+        if match not in (STRICT, LENIENT):
+            raise ValueError('Unknown cassette match mode %s' % match)
+        self.path = path
+        self.mode = mode
+        self.match = match
+        self._lock = threading.Lock()
+        self._pending = []
+        self._recordings = {}
+        self._played = collections.defaultdict(int)
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+        if mode == REPLAY:
+            self._load()
+
+    def _key(self, action, uri, headers, digest):
+        match_headers = tuple(sorted(
+            (name.lower(), value) for name, value in (headers or {}).items()
+            if name.lower() in MATCH_HEADERS))
+        if self.match == STRICT:
+            return action, uri, match_headers, digest
+        # ignore IDs, query strings, filter values and bodies
+        match_headers = tuple((name, value) for name, value in match_headers
+                              if name != 'x-nuage-filter')
+        return action, metrics.normalize_path(uri), match_headers
+
+    def _load(self):
+        with _open(self.path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = self._key(entry['method'], entry['path'],
+                                entry['headers'], entry['body_sha1'])
+                self._recordings.setdefault(key, []).append(entry)
+
+    def record(self, action, uri, body, headers, response, respstr):
+        entry = {
+            'method': action,
+            'path': uri,
+            'headers': dict((name, value) for name, value
+                            in (headers or {}).items()
+                            if name.lower() in MATCH_HEADERS),
+            'body_sha1': _body_digest(body),
+            'status': response.status,
+            'reason': response.reason,
+            'response_headers': dict(
+                (name, value) for name, value in response.getheaders()
+                if name.lower() in RECORD_HEADERS),
+            'response': _redact(respstr).decode('utf-8', 'replace')}
+        line = json.dumps(entry, separators=(',', ':'), sort_keys=True)
+        with self._lock:
+            self._pending.append(line.encode('utf-8') + '\n')
+            self.recorded += 1
+            if len(self._pending) >= FLUSH_LINES:
+                self._flush()
+
+    def _flush(self):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                     0o600)
+        with os.fdopen(fd, 'ab') as raw:
+            fcntl.flock(raw, fcntl.LOCK_EX)
+            try:
+                if self.path.endswith('.gz'):
+                    # one gzip member per flush, readers join them
+                    with gzip.GzipFile(fileobj=raw, mode='ab') as f:
+                        f.write(''.join(self._pending))
+                else:
+                    raw.write(''.join(self._pending))
+                raw.flush()
+            finally:
+                fcntl.flock(raw, fcntl.LOCK_UN)
+        self._pending = []
+
+    def play(self, action, uri, body, headers):
+        """Return (response, response body) recorded for a request"""
+        key = self._key(action, uri, headers, _body_digest(body))
+        with self._lock:
+            recordings = self._recordings.get(key, [])
+            played = self._played[key]
+            if played < len(recordings):
+                entry = recordings[played]
+            elif self.match == LENIENT and recordings:
+                entry = recordings[-1]
+            else:
+                self.misses += 1
+                raise CassetteError(
+                    reason='No recording of %s %s left in %s' % (
+                        action, uri, self.path))
+            self._played[key] = played + 1
+            self.replayed += 1
+        response = CassetteResponse(
+            entry['status'], entry['reason'].encode('utf-8'),
+            dict((name.encode('utf-8'), value.encode('utf-8'))
+                 for name, value in entry['response_headers'].items()))
+        return response, entry['response'].encode('utf-8')
+
+    def transport(self, pool):
+        """Stand-in for pool, see RESTProxyServer.use_cassette()"""
+        if self.mode == RECORD:
+            return RecordingTransport(pool, self)
+        return ReplayTransport(self)
+
+    def stats(self):
+        with self._lock:
+            return {'mode': self.mode,
+                    'match': self.match,
+                    'recorded': self.recorded,
+                    'replayed': self.replayed,
+                    'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._pending:
+                self._flush()
+
+
+class RecordingTransport(object):
+    """Issues requests through a connection pool and records them"""
+
+    def __init__(self, pool, cassette):
+        self.pool = pool
+        self.cassette = cassette
+
+    def request(self, action, uri, body, headers):
+        response, respstr = self.pool.request(action, uri, body, headers)
+        self.cassette.record(action, uri, body, headers, response, respstr)
+        return response, respstr
+
+    def stats(self):
+        stats = self.pool.stats()
+        stats['cassette'] = self.cassette.stats()
+        return stats
+
+    def close(self):
+        self.pool.close()
+
+
+class ReplayTransport(object):
+    """Answers requests from a cassette, in process"""
+
+    def __init__(self, cassette):
+        self.cassette = cassette
+
+    def request(self, action, uri, body, headers):
+        return self.cassette.play(action, uri, body, headers)
+
+    def stats(self):
+        return {'cassette': self.cassette.stats()}
+
+    def close(self):
+        pass
+
+
+_CASSETTES = {}
+_CASSETTES_LOCK = threading.Lock()
+
+
+def get_cassette(path, mode=REPLAY, match=STRICT):
+    """Return the cassette of path shared by the whole process"""
+    with _CASSETTES_LOCK:
+        cassette = _CASSETTES.get(path)
+        if cassette is None:
+            cassette = _CASSETTES[path] = Cassette(path, mode, match)
+            atexit.register(cassette.close)
+        return cassette
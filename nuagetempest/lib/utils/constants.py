@@ -135,6 +135,7 @@ NUAGE_PLUGIN_START_CMD   = NEUTRON_KILO_UBUNTU_START_CMD
 
 # Services
 NEUTRON_SERVICE = "neutron-server"
+NEUTRON_API_PORT = 9696
 
 # FIP constants
 FIP_RATE_GROUP = "fiprate"
@@ -0,0 +1,60 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    JSON encoding and decoding for the REST clients, through the fastest
+#    JSON library installed: simplejson (with its C speedups), then ujson,
+#    then the standard library json module. simplejson comes first as it
+#    decodes VSD listings at least as fast as ujson and, unlike ujson,
+#    encodes exactly like json.
+#
+#    Decoding errors are always raised as ValueError, like json does.
+#
+
+import json
+
+CODECS = ('simplejson', 'ujson', 'json')
+
+
+def _load(name):
+    """Return (loads, dumps) of codec name, None if it is not installed"""
+    if name == 'ujson':
+        try:
+            import ujson
+        except ImportError:
+            return None
+        return ujson.loads, ujson.dumps
+    if name == 'simplejson':
+        try:
+            import simplejson
+        except ImportError:
+            return None
+        # the pure python fallback is slower than json's C decoder
+        if not simplejson._import_c_make_encoder():
+            return None
+        return simplejson.loads, simplejson.dumps
+    if name == 'json':
+        return json.loads, json.dumps
+    raise ValueError('Unknown JSON codec %s' % name)
+
+
+def available_codecs():
+    return [name for name in CODECS if _load(name)]
+
+
+def set_codec(name=None):
+    """Use codec name, or the fastest installed one if name is None"""
+    global CODEC, loads, dumps
+    for candidate in ([name] if name else CODECS):
+        functions = _load(candidate)
+        if functions:
+            CODEC = candidate
+            loads, dumps = functions
+            return CODEC
+    raise ValueError('JSON codec %s is not installed' % name)
+
+
+# bound to the functions of the codec in use, see set_codec()
+CODEC = None
+loads = dumps = None
+set_codec()
@@ -0,0 +1,114 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Micro benchmark for the JSON codecs of json_codec.
+#
+#    Decodes the response bodies of recorded cassettes (see cassette.py),
+#    or synthetic vport and ACL entry listings when none is given, with
+#    every installed codec:
+#
+#      python -m nuagetempest.lib.utils.json_codec_benchmark run.jsonl.gz
+#
+
+import argparse
+import json
+import time
+import uuid
+
+from nuagetempest.lib.utils import cassette
+from nuagetempest.lib.utils import json_codec
+
+
+def recorded_payloads(paths):
+    """Return [(method, response body)] of the cassettes in paths"""
+    payloads = []
+    for path in paths:
+        with cassette._open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    payloads.append((entry['method'],
+                                     entry['response'].encode('utf-8')))
+    return payloads
+
+
+def synthetic_payloads(listings, objects):
+    vport = {'name': None, 'type': 'VM', 'addressSpoofing': 'INHERITED',
+             'active': True, 'multicast': 'INHERITED', 'VLANID': None,
+             'operationalState': 'UP', 'parentType': 'subnet'}
+    acl_entry = {'action': 'FORWARD', 'etherType': '0x0800',
+                 'protocol': '6', 'sourcePort': '*',
+                 'destinationPort': '80-443', 'DSCP': '*',
+                 'priority': 0, 'reflexive': True, 'statsLoggingEnabled':
+                 False, 'locationType': 'POLICYGROUP',
+                 'networkType': 'ENDPOINT_DOMAIN'}
+    payloads = []
+    for i in range(listings):
+        template = vport if i % 2 else acl_entry
+        listing = []
+        for priority in range(objects):
+            obj = dict(template, ID=str(uuid.uuid4()),
+                       parentID=str(uuid.uuid4()),
+                       externalID='%s@%s' % (uuid.uuid4(), uuid.uuid4()))
+            if 'priority' in obj:
+                obj['priority'] = priority
+            else:
+                obj['name'] = obj['externalID'].split('@')[0]
+            listing.append(obj)
+        payloads.append(('GET', json.dumps(listing)))
+        payloads.append(('DELETE', ''))
+    return payloads
+
+
+def decode_time(loads, bodies, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.time()
+        for body in bodies:
+            try:
+                loads(body)
+            except ValueError:
+                pass
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark JSON decoding of VSD responses')
+    parser.add_argument('cassettes', nargs='*',
+                        help='recorded cassettes, synthetic payloads if '
+                             'none given')
+    parser.add_argument('-r', '--rounds', type=int, default=5)
+    parser.add_argument('--listings', type=int, default=50)
+    parser.add_argument('--objects', type=int, default=500,
+                        help='objects per synthetic listing')
+    args = parser.parse_args()
+
+    if args.cassettes:
+        payloads = recorded_payloads(args.cassettes)
+    else:
+        payloads = synthetic_payloads(args.listings, args.objects)
+    bodies = [body for _, body in payloads]
+    read = [body for method, body in payloads if method != 'DELETE' and body]
+    print('%d responses, %.1f MB, %d decoded by RESTProxyServer' % (
+        len(bodies), sum(len(body) for body in bodies) / 1e6, len(read)))
+
+    print('%-12s %14s %14s' % ('codec', 'all (ms)', 'read only (ms)'))
+    for name in json_codec.available_codecs():
+        loads, _ = json_codec._load(name)
+        every = decode_time(loads, bodies, args.rounds)
+        only_read = decode_time(loads, read, args.rounds)
+        print('%-12s %14.2f %14.2f' % (name, every * 1000,
+                                       only_read * 1000))
+    baseline = decode_time(json.loads, bodies, args.rounds)
+    saved = baseline - decode_time(json_codec.loads, read, args.rounds)
+    print('in use: %s, saved vs stdlib decoding everything: %.2f ms '
+          '(%.0f%%)' % (json_codec.CODEC, saved * 1000,
+                        100 * saved / baseline if baseline else 0))
+
+
+if __name__ == '__main__':
+    main()
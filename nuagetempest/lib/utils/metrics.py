@@ -0,0 +1,158 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+
+import json
+import re
+import threading
+
+# latency bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0)
+
+UUID_RE = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-'
+                     r'[0-9a-fA-F]{4}-[0-9a-fA-F]{12}(@.*)?$')
+
+
+def normalize_path(url):
+    """Turn a resource path into its template, e.g.
+
+    /domains/<uuid>/zones?responseChoice=1 -> /domains/{id}/zones
+    """
+    path = url.split('?')[0]
+    return '/'.join('{id}' if UUID_RE.match(segment) else segment
+                    for segment in path.split('/'))
+
+
+class Histogram(object):
+    """Cumulative histogram over fixed bucket upper bounds"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count,
+                'sum': self.sum,
+                'max': self.max,
+                'mean': self.sum / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5),
+                'p90': self.quantile(0.9),
+                'p99': self.quantile(0.99),
+                'buckets': [[str(b), c] for b, c in zip(
+                    list(self.buckets) + ['+Inf'], self.counts)]}
+
+
+class EndpointStats(object):
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def to_dict(self):
+        return {'latency': self.latency.to_dict(),
+                'statuses': dict((str(status), count) for status, count
+                                 in self.statuses.items()),
+                'request_bytes': self.request_bytes,
+                'response_bytes': self.response_bytes}
+
+
+class RequestMetrics(object):
+    """Per endpoint (method, resource template) request statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, method, url, status, secs, request_bytes=0,
+               response_bytes=0):
+        key = (method, normalize_path(url))
+        with self._lock:
+            stats = self._endpoints.get(key)
+            if stats is None:
+                stats = self._endpoints[key] = EndpointStats()
+            stats.latency.observe(secs)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.request_bytes += request_bytes or 0
+            stats.response_bytes += response_bytes or 0
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def to_dict(self):
+        with self._lock:
+            return dict(('%s %s' % key, stats.to_dict())
+                        for key, stats in self._endpoints.items())
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2, sort_keys=True)
+
+    def to_prometheus(self, prefix='nuage_vsd_request'):
+        lines = ['# TYPE %s_seconds histogram' % prefix]
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            for (method, path), stats in endpoints:
+                labels = 'method="%s",path="%s"' % (method, path)
+                cumulative = 0
+                bounds = [repr(b) for b in stats.latency.buckets] + ['+Inf']
+                for bound, count in zip(bounds, stats.latency.counts):
+                    cumulative += count
+                    lines.append('%s_seconds_bucket{%s,le="%s"} %d' % (
+                        prefix, labels, bound, cumulative))
+                lines.append('%s_seconds_sum{%s} %f' % (
+                    prefix, labels, stats.latency.sum))
+                lines.append('%s_seconds_count{%s} %d' % (
+                    prefix, labels, stats.latency.count))
+            lines.append('# TYPE %s_total counter' % prefix)
+            for (method, path), stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append('%s_total{method="%s",path="%s",'
+                                 'status="%s"} %d' % (prefix, method, path,
+                                                      status, count))
+            lines.append('# TYPE %s_bytes counter' % prefix)
+            for (method, path), stats in endpoints:
+                for direction, size in (('request', stats.request_bytes),
+                                        ('response', stats.response_bytes)):
+                    lines.append('%s_bytes{method="%s",path="%s",'
+                                 'direction="%s"} %d' % (
+                                     prefix, method, path, direction, size))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, filename, fmt='json'):
+        report = self.to_prometheus() if fmt == 'prometheus' \
+            else self.to_json()
+        with open(filename, 'w') as f:
+            f.write(report)
+
+
+# shared by all NuageRestClient instances of a process
+REQUEST_METRICS = RequestMetrics()
@@ -0,0 +1,160 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Micro benchmark for the client side overhead of NuageRestClient.
+#
+#    Issues requests against an in-process REST proxy returning a canned
+#    listing, so only caller lookup and logging are measured:
+#
+#      python -m nuagetempest.lib.utils.nuage_client_benchmark -n 5000
+#
+#    --single-flight instead checks, against a mock VSD, that concurrent
+#    identical GETs reach the server once and that a write makes the next
+#    GET skip the request in flight:
+#
+#      python -m nuagetempest.lib.utils.nuage_client_benchmark \
+#          --single-flight --threads 16
+#
+
+import argparse
+import logging
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from nuagetempest.lib.utils import cache
+from nuagetempest.lib.utils import restproxy
+from nuagetempest.lib.utils import vsd_mock
+from nuagetempest.services import nuage_client
+
+# server latency of the GETs of check_single_flight(), in seconds
+FLIGHT_LATENCY = 0.3
+
+
+class CannedRESTProxy(object):
+    """Stands in for RESTProxyServer, answering every call with data"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def rest_call(self, action, resource, data, extra_headers=None):
+        return restproxy.RESTResponse(status_code=200, reason='OK',
+                                      data=self.data)
+
+
+class BenchmarkConf(object):
+    """Only the options read on the request path"""
+
+    class debug(object):
+        trace_requests = ''
+
+
+def make_client(objects):
+    client = nuage_client.NuageRestClient.__new__(
+        nuage_client.NuageRestClient)
+    client.restproxy = CannedRESTProxy(
+        [{'ID': str(i), 'name': 'vport-%d' % i} for i in range(objects)])
+    client.read_cache = None
+    client.single_flight = None
+    client.lazy_tracing = nuage_client.LAZY_TRACING
+    return client
+
+
+def test_list_vports(client, calls):
+    # named like a test method, so caller lookup stops here
+    start = time.time()
+    for _ in range(calls):
+        client.get('/domains/1/vports')
+    return (time.time() - start) / calls
+
+
+def check_single_flight(threads, latency=FLIGHT_LATENCY):
+    """Return the requests the mock VSD got for threads identical GETs,
+    and for a GET in flight, a PUT on its object and a GET after it.
+
+    Raises AssertionError unless they are 1 and 3.
+    """
+    vsd = vsd_mock.MockVSD()
+    subnet_id = vsd.seed(domains=1, zones=1, subnets=1, vports=10)[0]
+    vport = vsd.children(subnet_id, 'vports')[0]
+    server = vsd_mock.MockVSDServer(vsd)
+    server.latency['GET /subnets/{id}/vports'] = latency
+    server.latency['GET /vports/{id}'] = latency
+    server.start()
+    try:
+        proxy = restproxy.RESTProxyServer(
+            server.address, vsd_mock.BASE_URI, False,
+            '%s:%s' % (vsd_mock.USER, vsd_mock.PASSWORD),
+            vsd_mock.AUTH_RESOURCE, vsd_mock.ORGANIZATION, 30)
+        proxy.api_key_cache = restproxy.APIKeyCache(persistent=False)
+        proxy.generate_nuage_auth()
+        client = make_client(0)
+        client.restproxy = proxy
+        client.single_flight = cache.SingleFlight()
+
+        url = '/subnets/%s/vports' % subnet_id
+        before = server.requests
+        pool = ThreadPool(threads)
+        try:
+            listings = pool.map(lambda _: client.get(url), range(threads))
+        finally:
+            pool.close()
+            pool.join()
+        merged = server.requests - before
+        assert merged == 1, '%d threads sent %d GETs' % (threads, merged)
+        assert all(listing == listings[0] for listing in listings)
+
+        url = '/vports/%s' % vport['ID']
+        before = server.requests
+        in_flight = threading.Thread(target=client.get, args=(url,))
+        in_flight.start()
+        time.sleep(latency / 3)
+        client.put(url, {'name': 'renamed'})
+        renamed = client.get(url)
+        in_flight.join()
+        written = server.requests - before
+        assert written == 3, 'GET after PUT joined the GET before it'
+        assert renamed[0]['name'] == 'renamed'
+    finally:
+        proxy.pool.close()
+        server.shutdown()
+    return merged, written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark NuageRestClient logging overhead')
+    parser.add_argument('-n', '--calls', type=int, default=2000)
+    parser.add_argument('--objects', type=int, default=200,
+                        help='objects in each canned response')
+    parser.add_argument('--single-flight', action='store_true',
+                        help='check GET merging against a mock VSD')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='concurrent GETs of --single-flight')
+    args = parser.parse_args()
+
+    nuage_client.CONF = BenchmarkConf
+    if args.single_flight:
+        merged, written = check_single_flight(args.threads)
+        print('%d concurrent GETs: %d request(s); GET, PUT, GET: %d '
+              'requests' % (args.threads, merged, written))
+        return
+    client = make_client(args.objects)
+    logger = logging.getLogger(nuage_client.__name__)
+    logger.addHandler(logging.NullHandler())
+
+    print('%-10s %-8s %14s' % ('tracing', 'level', 'us/request'))
+    for level in (logging.WARNING, logging.INFO, logging.DEBUG):
+        logger.setLevel(level)
+        for lazy in (False, True):
+            client.lazy_tracing = lazy
+            secs = test_list_vports(client, args.calls)
+            print('%-10s %-8s %14.1f' % ('lazy' if lazy else 'eager',
+                                         logging.getLevelName(level),
+                                         secs * 1e6))
+
+
+if __name__ == '__main__':
+    main()
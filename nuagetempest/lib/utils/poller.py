@@ -0,0 +1,191 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Wait for VSD / VRS state to converge instead of sleeping:
+#
+#      poller = Poller(timeout=60)
+#      vport = poller.wait_for_appear(
+#          lambda: client.get_vport(constants.SUBNETWORK, subnet_id,
+#                                   filters='externalID',
+#                                   filter_value=port_id),
+#          description='vport')
+#
+#    The delay between attempts grows exponentially up to max_delay and is
+#    cut short by the deadline. Every wait records how long the state took
+#    to converge in CONVERGENCE, keyed by its description.
+#
+
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+from oslo_log import log as logging
+
+from nuagetempest.lib.utils import exceptions as n_exceptions
+from nuagetempest.lib.utils import metrics
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60
+INITIAL_DELAY = 0.2
+MAX_DELAY = 5
+BACKOFF = 2
+CONCURRENCY = 8
+
+# convergence time bucket upper bounds, in seconds
+CONVERGENCE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                       120.0, 300.0)
+
+_RAISE = object()
+
+
+class ConvergenceMetrics(object):
+    """Per description convergence time and timeout statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._timeouts = {}
+
+    def record(self, description, secs, converged=True):
+        with self._lock:
+            if converged:
+                histogram = self._latency.get(description)
+                if histogram is None:
+                    histogram = self._latency[description] = \
+                        metrics.Histogram(CONVERGENCE_BUCKETS)
+                histogram.observe(secs)
+            else:
+                self._timeouts[description] = \
+                    self._timeouts.get(description, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._timeouts.clear()
+
+    def to_dict(self):
+        with self._lock:
+            report = {}
+            for description in set(self._latency) | set(self._timeouts):
+                histogram = self._latency.get(description)
+                report[description] = {
+                    'latency': histogram.to_dict() if histogram else None,
+                    'timeouts': self._timeouts.get(description, 0)}
+            return report
+
+
+# shared by all pollers of a process
+CONVERGENCE = ConvergenceMetrics()
+
+
+class Poller(object):
+    """Calls a fetch function until its result satisfies a predicate"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, initial_delay=INITIAL_DELAY,
+                 max_delay=MAX_DELAY, backoff=BACKOFF, max_attempts=None,
+                 exc_class=n_exceptions.TimeoutException,
+                 timer=time.time, sleep=time.sleep):
+        """@param max_attempts give up after that many fetches, even when
+               the deadline is not reached yet
+        @param exc_class exception raised when the state did not converge
+        """
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.max_attempts = max_attempts
+        self.exc_class = exc_class
+        self._timer = timer
+        self._sleep = sleep
+
+    def wait_until(self, fetch, predicate=bool, description=None,
+                   ignore=(), default=_RAISE):
+        """Return the first fetch() result for which predicate holds.
+
+        @param ignore exception types raised by fetch which mean the state
+               is not there (yet), the result is then taken to be None
+        @param default returned instead of raising exc_class on timeout
+        """
+        description = description or getattr(fetch, '__name__', 'state')
+        start = self._timer()
+        deadline = start + self.timeout
+        delay = self.initial_delay
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                value = fetch()
+            except ignore:
+                value = None
+            now = self._timer()
+            if predicate(value):
+                CONVERGENCE.record(description, now - start)
+                LOG.debug("%s converged after %.3fs (%d attempts)",
+                          description, now - start, attempt)
+                return value
+            if now >= deadline or (self.max_attempts and
+                                   attempt >= self.max_attempts):
+                break
+            self._sleep(min(delay, deadline - now))
+            delay = min(delay * self.backoff, self.max_delay)
+
+        CONVERGENCE.record(description, now - start, converged=False)
+        if default is not _RAISE:
+            return default
+        raise self.exc_class("%s did not converge within %.1fs "
+                             "(%d attempts)" % (description, now - start,
+                                                attempt))
+
+    def wait_for_appear(self, fetch, description=None, **kwargs):
+        """Wait until fetch() returns something, NotFound meaning nothing"""
+        kwargs.setdefault('ignore', (n_exceptions.NotFound,))
+        return self.wait_until(fetch, bool, description, **kwargs)
+
+    def wait_for_disappear(self, fetch, description=None, **kwargs):
+        """Wait until fetch() returns nothing or raises NotFound"""
+        kwargs.setdefault('ignore', (n_exceptions.NotFound,))
+        return self.wait_until(fetch, lambda value: not value, description,
+                               **kwargs)
+
+    def wait_for_change(self, fetch, initial, key=None, description=None,
+                        **kwargs):
+        """Wait until key(fetch()) differs from key(initial)"""
+        key = key or (lambda value: value)
+        before = key(initial)
+        return self.wait_until(fetch, lambda value: key(value) != before,
+                               description, **kwargs)
+
+    def _wait(self, check):
+        fetch, predicate = check[0], check[1]
+        description = check[2] if len(check) > 2 else None
+        try:
+            return self.wait_until(fetch, predicate, description), None
+        except Exception as e:
+            return None, e
+
+    def wait_for_all(self, checks, concurrency=CONCURRENCY):
+        """Wait for independent states concurrently.
+
+        @param checks iterable of (fetch, predicate[, description])
+        @return the converged values, in the order of checks; the first
+                error, in that order, is raised
+        """
+        checks = list(checks)
+        if not checks:
+            return []
+        concurrency = min(concurrency, len(checks))
+        if concurrency <= 1:
+            results = [self._wait(check) for check in checks]
+        else:
+            pool = ThreadPool(concurrency)
+            try:
+                results = pool.map(self._wait, checks)
+            finally:
+                pool.close()
+                pool.join()
+        for _, error in results:
+            if error is not None:
+                raise error
+        return [value for value, _ in results]
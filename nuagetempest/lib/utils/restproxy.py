@@ -10,22 +10,45 @@
 #
 
 import base64
+import errno
+import fcntl
+import hashlib
 import httplib
 import json
 import logging
+import os
+import Queue
+import random
 import socket
+import stat
+import tempfile
+import threading
+import time
+
+from nuagetempest.lib.utils import json_codec
 
 LOG = logging.getLogger(__name__)
 MAX_RETRIES = 5
+POOL_MAXSIZE = 10
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+BREAKER_PROBE_TIMEOUT = 30
 
 
 class RESTResponse(object):
-    def __init__(self, status_code, reason=None, data=None):
+    def __init__(self, status_code, reason=None, data=None, headers=None):
         """ Initializes a request """
 
         self.status = status_code
         self.data = data
         self.reason = reason
+        # response headers, lower-cased names
+        self.headers = headers if headers is not None else {}
+        # request and response body sizes, in bytes
+        self.request_size = 0
+        self.response_size = 0
 
 
 class RESTProxyBaseException(Exception):
@@ -64,6 +87,374 @@ class RESTProxyError(RESTProxyBaseException):
         super(RESTProxyError, self).__init__()
 
 
+class HTTPConnectionPool(object):
+    """Bounded pool of keep-alive connections to a single REST server.
+
+    Idle connections are kept in a LIFO queue of at most ``maxsize``
+    entries, so the most recently used (and least likely to be stale)
+    socket is handed out first. Connections released while the pool is
+    full are closed. A reused connection that turns out to be stale is
+    transparently reconnected once.
+    """
+
+    def __init__(self, server, port, serverssl, timeout,
+                 maxsize=POOL_MAXSIZE):
+        self.server = server
+        self.port = port
+        self.serverssl = serverssl
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self._idle = Queue.LifoQueue(maxsize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _new_conn(self):
+        if self.serverssl:
+            return httplib.HTTPSConnection(
+                self.server, self.port, timeout=self.timeout)
+        return httplib.HTTPConnection(
+            self.server, self.port, timeout=self.timeout)
+
+    def _get_conn(self):
+        try:
+            conn = self._idle.get(block=False)
+            self._count('hits')
+        except Queue.Empty:
+            conn = self._new_conn()
+            self._count('misses')
+        return conn
+
+    def _put_conn(self, conn):
+        if self.maxsize > 0:
+            try:
+                self._idle.put(conn, block=False)
+                return
+            except Queue.Full:
+                pass
+        conn.close()
+
+    def request(self, action, uri, body, headers):
+        """Issue a request and return (response, response body).
+
+        The response body is always read in full, so the connection can
+        be handed back to the pool. Socket timeouts and errors on fresh
+        connections are raised to the caller.
+        """
+        conn = self._get_conn()
+        reused = conn.sock is not None
+        try:
+            try:
+                conn.request(action, uri, body, headers)
+                response = conn.getresponse()
+            except socket.timeout:
+                raise
+            except (httplib.BadStatusLine, httplib.CannotSendRequest,
+                    socket.error):
+                if not reused:
+                    raise
+                # The server closed the idle keep-alive socket, reconnect
+                LOG.debug('RESTProxy: reconnecting stale connection to '
+                          '%s:%s', self.server, self.port)
+                self._count('reconnects')
+                conn.close()
+                conn.request(action, uri, body, headers)
+                response = conn.getresponse()
+            respstr = response.read()
+        except Exception:
+            conn.close()
+            raise
+        if response.will_close:
+            conn.close()
+        self._put_conn(conn)
+        return response, respstr
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'reconnects': self.reconnects,
+                    'idle': self._idle.qsize()}
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get(block=False).close()
+            except Queue.Empty:
+                break
+
+
+class RetryPolicy(object):
+    """Exponential backoff with full jitter and a per request budget.
+
+    A request is attempted at most max_attempts times; before the n-th
+    retry the caller sleeps a random time in [0, min(cap, base * 2^n)].
+    """
+
+    def __init__(self, max_attempts=MAX_RETRIES, backoff_base=BACKOFF_BASE,
+                 backoff_max=BACKOFF_MAX, jitter=True, sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.exhausted = 0
+
+    def backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def retry(self, attempt):
+        """Wait before retrying; return False once the budget is spent"""
+        if attempt >= self.max_attempts:
+            with self._lock:
+                self.exhausted += 1
+            return False
+        with self._lock:
+            self.retries += 1
+        self._sleep(self.backoff(attempt - 1))
+        return True
+
+
+class CircuitBreaker(object):
+    """Fail fast while the REST server keeps failing.
+
+    After failure_threshold consecutive failures the breaker opens and
+    requests are rejected until reset_timeout has passed. Then a single
+    trial request is let through (half-open): its success closes the
+    breaker, its failure opens it again. Requests arriving while the
+    trial is in flight wait at most probe_timeout for its outcome.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=BREAKER_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT,
+                 probe_timeout=BREAKER_PROBE_TIMEOUT, timer=time.time):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._probed = threading.Condition(self._lock)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self.rejected = 0
+
+    def _set_state(self, state):
+        if state != self.state:
+            LOG.warning('RESTProxy: circuit breaker %s -> %s',
+                        self.state, state)
+            self.state = state
+            self._probed.notify_all()
+
+    def allow(self):
+        with self._lock:
+            deadline = time.time() + self.probe_timeout
+            while self.state == self.HALF_OPEN:
+                # another request is probing the server, wait for it
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._probed.wait(remaining)
+            if self.state == self.CLOSED:
+                return True
+            if (self.state == self.OPEN and
+                    self._timer() - self.opened_at >= self.reset_timeout):
+                self._set_state(self.HALF_OPEN)
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Reopen the breaker if a trial request ended without a reply"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.opened_at = self._timer()
+                self._set_state(self.OPEN)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN or
+                    self.failures >= self.failure_threshold):
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.opened_at = self._timer()
+                self._set_state(self.OPEN)
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state,
+                    'failures': self.failures,
+                    'trips': self.trips,
+                    'rejected': self.rejected}
+
+
+class APIKeyCache(object):
+    """VSD APIKeys shared by RESTProxyServer instances and processes.
+
+    Keys are kept in memory and, if persistent, in a file per (server,
+    user, org) in a directory that only the current user can access.
+    Refreshing an APIKey holds a lock for that key and an exclusive flock
+    on its file, so concurrent callers re-authenticate only once: the
+    others find the new key when they get the lock. The file is skipped
+    if the directory or the file is not private to the current user.
+    """
+
+    def __init__(self, directory=None, persistent=True):
+        self.directory = directory or os.path.join(
+            tempfile.gettempdir(), 'nuage-apikeys-%d' % os.getuid())
+        self.persistent = persistent
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._keys = {}
+        self.authentications = 0
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key)).hexdigest()
+        return os.path.join(self.directory, 'nuage-apikey-%s' % digest)
+
+    @staticmethod
+    def _private(st):
+        return st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+    def _open(self, key):
+        """Return the file of key opened for update, None if not private"""
+        try:
+            os.mkdir(self.directory, 0o700)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        st = os.lstat(self.directory)
+        if not stat.S_ISDIR(st.st_mode) or not self._private(st):
+            LOG.warning('RESTProxy: %s is not private, not storing APIKeys '
+                        'there', self.directory)
+            return None
+        try:
+            fd = os.open(self._path(key),
+                         os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        except OSError as e:
+            if e.errno != errno.ELOOP:
+                raise
+            fd = None
+        if fd is None or not self._private(os.fstat(fd)):
+            if fd is not None:
+                os.close(fd)
+            LOG.warning('RESTProxy: %s is not private, ignoring it',
+                        self._path(key))
+            return None
+        return os.fdopen(fd, 'r+')
+
+    @staticmethod
+    def _valid(entry, stale):
+        if not entry or entry['APIKey'] == stale:
+            return False
+        expiry = entry.get('expiry')
+        # VSD reports the expiry in milliseconds since epoch
+        return not expiry or expiry / 1000.0 > time.time()
+
+    def _authenticate(self, authenticate):
+        apikey, expiry = authenticate()
+        with self._lock:
+            self.authentications += 1
+        return {'APIKey': apikey, 'expiry': expiry}
+
+    def _refresh(self, key, authenticate, stale):
+        f = self._open(key) if self.persistent else None
+        if f is None:
+            return self._authenticate(authenticate)
+        with f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                try:
+                    entry = json.loads(f.read())
+                except ValueError:
+                    entry = None
+                if not self._valid(entry, stale):
+                    entry = self._authenticate(authenticate)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(entry))
+                    f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return entry
+
+    def get(self, key, authenticate, stale=None):
+        """Return a valid APIKey for key.
+
+        @param authenticate callable returning (APIKey, expiry) from VSD
+        @param stale APIKey the caller saw rejected, never returned again
+        """
+        with self._lock:
+            entry = self._keys.get(key)
+            if self._valid(entry, stale):
+                return entry['APIKey']
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # only callers of the same key wait for the authentication
+        with key_lock:
+            with self._lock:
+                entry = self._keys.get(key)
+            if self._valid(entry, stale):
+                return entry['APIKey']
+            entry = self._refresh(key, authenticate, stale)
+            with self._lock:
+                self._keys[key] = entry
+            return entry['APIKey']
+
+
+API_KEY_CACHE = APIKeyCache()
+
+_POOLS = {}
+_BREAKERS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_connection_pool(server, port, serverssl, timeout):
+    """Return the shared connection pool of a (server, port, ssl) tuple"""
+    key = (server, port, bool(serverssl))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = HTTPConnectionPool(server, port, serverssl, timeout)
+            _POOLS[key] = pool
+        return pool
+
+
+def get_circuit_breaker(server, port, serverssl):
+    """Return the circuit breaker shared by a (server, port, ssl) tuple"""
+    key = (server, port, bool(serverssl))
+    with _POOLS_LOCK:
+        breaker = _BREAKERS.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _BREAKERS[key] = breaker
+        return breaker
+
+
+def close_connection_pools():
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
+
+
 class RESTProxyServer(object):
     def __init__(self, server, base_uri, serverssl,
                  serverauth, auth_resource,
@@ -81,82 +472,107 @@ class RESTProxyServer(object):
         self.auth_resource = auth_resource
         self.organization = organization
         self.timeout = servertimeout
-        self.retry = 0
         self.auth = None
+        self.apikey = None
+        self.api_key_cache = API_KEY_CACHE
         self.success_codes = range(200, 207)
+        self.pool = get_connection_pool(self.server, self.port,
+                                        self.serverssl, self.timeout)
+        self.retry_policy = RetryPolicy()
+        self.breaker = get_circuit_breaker(self.server, self.port,
+                                           self.serverssl)
+
+    def use_cassette(self, cassette):
+        """Record requests to, or replay them from, a cassette.Cassette"""
+        self.pool = cassette.transport(self.pool)
+        # every client authenticates through the cassette, so a replay
+        # never depends on APIKeys cached when it was recorded
+        self.api_key_cache = APIKeyCache(persistent=False)
+
+    def metrics(self):
+        return {'pool': self.pool.stats(),
+                'retries': self.retry_policy.retries,
+                'retries_exhausted': self.retry_policy.exhausted,
+                'breaker': self.breaker.stats()}
 
     def _rest_call(self, action, resource, data, extra_headers=None):
-        if self.retry >= MAX_RETRIES:
-            LOG.error(('RESTProxy: Max retries exceeded'))
-            # Get ready for the next set of operation
-            self.retry = 0
-            return 0, None, None, None
         uri = self.base_uri + resource
-        body = json.dumps(data)
+        body = json_codec.dumps(data)
         headers = {}
         headers['Content-type'] = 'application/json'
         headers['X-Nuage-Organization'] = self.organization
         if self.auth:
             headers['Authorization'] = self.auth
-        conn = None
         if extra_headers:
             headers.update(extra_headers)
-        if self.serverssl:
-            conn = httplib.HTTPSConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(('RESTProxy: Could not establish HTTPS '
-                           'connection'))
-                return 0, None, None, None
-        else:
-            conn = httplib.HTTPConnection(
-                self.server, self.port, timeout=self.timeout)
-            if conn is None:
-                LOG.error(('RESTProxy: Could not establish HTTP '
-                           'connection'))
-                return 0, None, None, None
 
-        try:
-            conn.request(action, uri, body, headers)
-            response = conn.getresponse()
-            respstr = response.read()
-            respdata = respstr
-            if response.status in self.success_codes:
-                try:
-                    respdata = json.loads(respstr)
-                except ValueError:
-                    # response was not JSON, ignore the exception
-                    pass
-            ret = RESTResponse(status_code=response.status,
-                               reason=response.reason,
-                               data=respdata)
-            #ret = (response.status, response.reason, respstr, respdata)
-        except (socket.timeout, socket.error) as e:
-            LOG.error(('ServerProxy: %(action)s failure, %(e)r'), locals())
-            # retry
-            self.retry = self.retry + 1
-            return self.rest_call(action, resource, data, extra_headers)
-        conn.close()
-        self.retry = 0
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                LOG.error('RESTProxy: circuit open, failing %s %s fast',
+                          action, resource)
+                raise RESTProxyError('circuit open, %s %s not sent to %s' %
+                                     (action, resource, self.server))
+            attempt += 1
+            try:
+                response, respstr = self.pool.request(action, uri, body,
+                                                      headers)
+            except (socket.timeout, socket.error,
+                    httplib.HTTPException) as e:
+                LOG.error(('ServerProxy: %(action)s failure, %(e)r'),
+                          locals())
+                self.breaker.record_failure()
+                if self.retry_policy.retry(attempt):
+                    continue
+                LOG.error(('RESTProxy: Max retries exceeded'))
+                raise RESTProxyError('%s %s failed after %d attempts, %r' %
+                                     (action, resource, attempt, e))
+            except Exception:
+                self.breaker.release()
+                raise
+            if response.status == 503:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            break
+
+        respdata = respstr
+        # nobody reads the body of a DELETE response, don't decode it
+        if (response.status in self.success_codes and respstr and
+                action != 'DELETE'):
+            try:
+                respdata = json_codec.loads(respstr)
+            except ValueError:
+                # response was not JSON, ignore the exception
+                pass
+        ret = RESTResponse(status_code=response.status,
+                           reason=response.reason,
+                           data=respdata,
+                           headers=dict(response.getheaders()))
+        ret.request_size = len(body)
+        ret.response_size = len(respstr)
         return ret
 
-    def generate_nuage_auth(self):
+    def _authenticate(self):
         data = ''
         encoded_auth = base64.encodestring(self.serverauth).strip()
-        self.auth = 'Basic ' + encoded_auth
-        resp = self.rest_call('GET',
-                              self.auth_resource, data)
-        data = resp.data[0]
-        if resp.status in self.success_codes and data['APIKey']:
-            respkey = data['APIKey']
+        resp = self._rest_call('GET', self.auth_resource, data,
+                               {'Authorization': 'Basic ' + encoded_auth})
+        if resp.status in self.success_codes and resp.data[0]['APIKey']:
+            respkey = resp.data[0]['APIKey']
         else:
-            if resp.status == 0:
-                assert 0, 'Could not establish conn with REST server. Abort'
-            else:
-                assert 0, 'Could not authenticate to REST server. Abort'
+            assert 0, 'Could not authenticate to REST server. Abort'
+        return respkey, resp.data[0].get('APIKeyExpiry')
+
+    def generate_nuage_auth(self, stale_key=None):
+        cache_key = (self.server, self.port, self.base_uri,
+                     self.serverauth.split(':')[0], self.organization)
+        respkey = self.api_key_cache.get(cache_key, self._authenticate,
+                                         stale_key)
         uname = self.serverauth.split(':')[0]
         new_uname_pass = uname + ':' + respkey
         auth = 'Basic ' + base64.encodestring(new_uname_pass).strip()
+        self.apikey = respkey
         self.auth = auth
 
     def rest_call(self, action, resource, data, extra_headers=None):
@@ -166,7 +582,7 @@ class RESTProxyServer(object):
         If at all authentication expires with VSD, re-authenticate.
         '''
         if response.status == 401 and response.reason == 'Unauthorized':
-            self.generate_nuage_auth()
+            self.generate_nuage_auth(stale_key=self.apikey)
             return self._rest_call(action, resource, data,
                                    extra_headers=extra_headers)
         return response
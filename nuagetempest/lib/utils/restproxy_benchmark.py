@@ -0,0 +1,156 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Micro benchmark for the RESTProxyServer connection pool.
+#
+#    Starts a local keep-alive stub server (HTTPS when a certificate is
+#    given, with optional dropped or stalled requests) and measures the
+#    per call latency of RESTProxyServer with and without connection
+#    reuse:
+#
+#      python -m nuagetempest.lib.utils.restproxy_benchmark -n 2000 \
+#          --certfile server.pem
+#
+
+import argparse
+import BaseHTTPServer
+import json
+import ssl
+import SocketServer
+import threading
+import time
+
+from nuagetempest.lib.utils import restproxy
+
+
+class StubRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+    body = json.dumps([{'ID': 'stub', 'APIKey': 'stub-key'}])
+
+    def _reply(self):
+        self.server.count_request()
+        if self.server.stall:
+            time.sleep(self.server.stall)
+        if self.server.take_failure():
+            # drop the connection without answering
+            self.close_connection = 1
+            return
+        length = int(self.headers.getheader('content-length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, certfile=None, keyfile=None,
+                 handler=StubRequestHandler):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.certfile = certfile
+        self.keyfile = keyfile
+        # fault injection: drop the next `failures` requests and delay
+        # every request by `stall` seconds
+        self.failures = 0
+        self.stall = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def take_failure(self):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                return True
+            return False
+
+    def get_request(self):
+        sock, addr = self.socket.accept()
+        if self.certfile:
+            sock = ssl.wrap_socket(sock, server_side=True,
+                                   certfile=self.certfile,
+                                   keyfile=self.keyfile)
+        return sock, addr
+
+    def handle_error(self, request, client_address):
+        # clients drop keep-alive connections without a TLS close_notify
+        pass
+
+    @property
+    def address(self):
+        return '%s:%s' % self.server_address
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+
+def run(proxy, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.time()
+        proxy.rest_call('GET', '/enterprises', '')
+        latencies.append(time.time() - start)
+    latencies.sort()
+    return {'mean_ms': 1000 * sum(latencies) / len(latencies),
+            'p50_ms': 1000 * latencies[len(latencies) // 2],
+            'p99_ms': 1000 * latencies[int(len(latencies) * 0.99)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark RESTProxyServer connection reuse')
+    parser.add_argument('-n', '--calls', type=int, default=1000)
+    parser.add_argument('--certfile', help='PEM certificate, enables HTTPS')
+    parser.add_argument('--keyfile')
+    args = parser.parse_args()
+
+    serverssl = bool(args.certfile)
+    if serverssl and hasattr(ssl, '_create_unverified_context'):
+        # the stub certificate is self signed
+        ssl._create_default_https_context = ssl._create_unverified_context
+
+    server = StubServer(args.certfile, args.keyfile)
+    server.start()
+    proxy = restproxy.RESTProxyServer(server.address, '/nuage/api/v3_0',
+                                      serverssl, 'csproot:csproot', '/me',
+                                      'csp', 30)
+
+    host, port = server.server_address
+    proxy.pool = restproxy.HTTPConnectionPool(host, port, serverssl, 30,
+                                              maxsize=0)
+    unpooled = run(proxy, args.calls)
+
+    proxy.pool = restproxy.HTTPConnectionPool(host, port, serverssl, 30)
+    pooled = run(proxy, args.calls)
+
+    print('%-10s %10s %10s %10s' % ('', 'mean(ms)', 'p50(ms)', 'p99(ms)'))
+    for name, result in (('new conn', unpooled), ('pooled', pooled)):
+        print('%-10s %10.3f %10.3f %10.3f' % (
+            name, result['mean_ms'], result['p50_ms'], result['p99_ms']))
+    print('saved per call: %.3f ms' % (unpooled['mean_ms'] -
+                                       pooled['mean_ms']))
+    print('pool stats: %s' % proxy.pool.stats())
+    proxy.pool.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Dependency aware, concurrent deletion of test resources.
+#
+#      teardown = TearDown()
+#      vlans = teardown.add_all('vlan', cls.gatewayvlans,
+#                               lambda vlan: delete_vlan(vlan[0]['ID']))
+#      teardown.add_all('port', cls.gatewayports,
+#                       lambda port: delete_port(port[0]['ID']),
+#                       after=vlans)
+#      teardown.run()
+#
+#    Resources are deleted layer by layer: a layer holds every resource
+#    whose 'after' resources are gone, and is deleted concurrently. Deletes
+#    failing with a conflict (409), typically because the VSD did not
+#    release a child yet, are retried with backoff; NotFound counts as
+#    deleted. All failures are logged and raised as one TearDownException.
+#
+
+import time
+
+from multiprocessing.pool import ThreadPool
+from oslo_log import log as logging
+from tempest.lib import exceptions as lib_exc
+
+from nuagetempest.lib.utils import exceptions as n_exceptions
+
+LOG = logging.getLogger(__name__)
+
+CONCURRENCY = 8
+CONFLICT_RETRIES = 5
+CONFLICT_DELAY = 0.5
+
+CONFLICT_EXCEPTIONS = (lib_exc.Conflict, n_exceptions.Conflict)
+NOT_FOUND_EXCEPTIONS = (lib_exc.NotFound, n_exceptions.NotFound)
+
+
+class TearDown(object):
+
+    def __init__(self, concurrency=CONCURRENCY,
+                 conflict_retries=CONFLICT_RETRIES,
+                 conflict_delay=CONFLICT_DELAY, sleep=time.sleep):
+        self.concurrency = concurrency
+        self.conflict_retries = conflict_retries
+        self.conflict_delay = conflict_delay
+        self._sleep = sleep
+        # insertion ordered keys, key -> (delete, after)
+        self._keys = []
+        self._resources = {}
+        self.deleted = 0
+        self.conflicts = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key, delete, after=()):
+        """Register a resource.
+
+        @param key unique name of the resource
+        @param delete callable deleting it
+        @param after keys of the resources to delete before this one
+        """
+        if key in self._resources:
+            raise ValueError('Resource %s registered twice' % key)
+        self._keys.append(key)
+        self._resources[key] = (delete, tuple(after))
+        return key
+
+    def add_all(self, kind, items, delete, after=()):
+        """Register delete(item) for each of items, return their keys"""
+        return [self.add('%s-%d' % (kind, i),
+                         lambda item=item: delete(item), after)
+                for i, item in enumerate(items)]
+
+    def layers(self):
+        """Return the keys grouped in layers that can be deleted together"""
+        blocking = {}
+        unblocks = dict((key, []) for key in self._keys)
+        for key in self._keys:
+            after = self._resources[key][1]
+            for dependency in after:
+                if dependency not in self._resources:
+                    raise ValueError('%s is to be deleted after unknown '
+                                     'resource %s' % (key, dependency))
+                unblocks[dependency].append(key)
+            blocking[key] = len(after)
+
+        layers = []
+        layer = [key for key in self._keys if not blocking[key]]
+        while layer:
+            layers.append(layer)
+            next_layer = []
+            for key in layer:
+                for dependent in unblocks[key]:
+                    blocking[dependent] -= 1
+                    if not blocking[dependent]:
+                        next_layer.append(dependent)
+            layer = next_layer
+        if sum(len(layer) for layer in layers) != len(self._keys):
+            raise ValueError('Dependency cycle between %s' % ', '.join(
+                key for key in self._keys if blocking[key]))
+        return layers
+
+    def _delete(self, key):
+        """Delete one resource, return the exception it failed with"""
+        delete = self._resources[key][0]
+        attempt = 0
+        while True:
+            try:
+                delete()
+                return None
+            except NOT_FOUND_EXCEPTIONS:
+                return None
+            except CONFLICT_EXCEPTIONS as e:
+                if attempt >= self.conflict_retries:
+                    return e
+                self.conflicts += 1
+                self._sleep(self.conflict_delay * (2 ** attempt))
+                attempt += 1
+            except Exception as e:
+                return e
+
+    def run(self, raise_errors=True):
+        """Delete everything, return the [(key, exception)] failures.
+
+        The resources depending on a failed one are still tried.
+        """
+        start = time.time()
+        layers = self.layers()
+        failures = []
+        pool = ThreadPool(self.concurrency) if self.concurrency > 1 else None
+        try:
+            for layer in layers:
+                if pool and len(layer) > 1:
+                    errors = pool.map(self._delete, layer)
+                else:
+                    errors = [self._delete(key) for key in layer]
+                for key, error in zip(layer, errors):
+                    if error is None:
+                        self.deleted += 1
+                    else:
+                        LOG.error('Failed to delete %s: %s', key, error)
+                        failures.append((key, error))
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        LOG.info('Deleted %d of %d resources in %d layers in %.2fs, '
+                 '%d conflicts retried', self.deleted, len(self._keys),
+                 len(layers), time.time() - start, self.conflicts)
+        if failures and raise_errors:
+            raise n_exceptions.TearDownException(
+                '\n'.join('%s: %s' % (key, error)
+                          for key, error in failures),
+                num=len(failures))
+        return failures
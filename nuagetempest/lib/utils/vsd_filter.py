@@ -0,0 +1,105 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Builder for VSD predicate filters (X-Nuage-Filter).
+#
+#    Conditions are combined with & (and) and | (or):
+#
+#      flt = where(name=port_id) & is_in('addressSpoofing',
+#                                       ['ENABLED', 'INHERITED'])
+#      client.get_vport(constants.L2_DOMAIN, l2dom_id, filters=flt)
+#
+#    str(flt) is the predicate itself, which vspk fetchers accept as
+#    their filter argument as well.
+#
+
+
+def _quote(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, long, float)):
+        return str(value)
+    return "'%s'" % ('%s' % value).replace("'", "\\'")
+
+
+class Filter(object):
+    """A VSD predicate, composable with & and |"""
+
+    def compile(self, transform=None):
+        """Return the predicate expression.
+
+        @param transform optional callable(attr, value) returning the
+               value to compare attr with, e.g. to expand externalIDs
+        """
+        raise NotImplementedError()
+
+    def __and__(self, other):
+        return Compound('and', [self, other])
+
+    def __or__(self, other):
+        return Compound('or', [self, other])
+
+    def __str__(self):
+        return self.compile()
+
+    def headers(self, transform=None):
+        return {'X-NUAGE-FilterType': 'predicate',
+                'X-Nuage-Filter': self.compile(transform)}
+
+
+class Condition(Filter):
+
+    def __init__(self, attr, value, op='IS'):
+        self.attr = attr
+        self.value = value
+        self.op = op
+
+    def compile(self, transform=None):
+        value = transform(self.attr, self.value) if transform else self.value
+        return '%s %s %s' % (self.attr, self.op, _quote(value))
+
+
+class Compound(Filter):
+
+    def __init__(self, operator, filters):
+        self.operator = operator
+        self.filters = []
+        # flatten nested compounds of the same operator
+        for flt in filters:
+            if isinstance(flt, Compound) and flt.operator == operator:
+                self.filters.extend(flt.filters)
+            else:
+                self.filters.append(flt)
+
+    def compile(self, transform=None):
+        parts = []
+        for flt in self.filters:
+            expression = flt.compile(transform)
+            if isinstance(flt, Compound) and len(flt.filters) > 1:
+                expression = '(%s)' % expression
+            parts.append(expression)
+        return (' %s ' % self.operator).join(parts)
+
+
+def where(**conditions):
+    """attr IS value for every keyword, and-ed together"""
+    return all_of(*[Condition(attr, value)
+                    for attr, value in sorted(conditions.items())])
+
+
+def is_in(attr, values):
+    """attr equal to any of values"""
+    return any_of(*[Condition(attr, value) for value in values])
+
+
+def all_of(*filters):
+    if len(filters) == 1:
+        return filters[0]
+    return Compound('and', filters)
+
+
+def any_of(*filters):
+    if len(filters) == 1:
+        return filters[0]
+    return Compound('or', filters)
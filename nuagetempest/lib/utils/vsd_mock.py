@@ -0,0 +1,575 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Local stand-in for the VSD REST API, for benchmarking the client
+#    without a VSD.
+#
+#    MockVSD keeps objects in memory as a parent/child hierarchy, created
+#    with POST /<parent type>/<parent id>/<type> like on the VSD. Listings
+#    honour X-Nuage-Filter predicates and X-Nuage-Page/X-Nuage-PageSize
+#    paging. MockVSDServer serves it over HTTP(S). Per endpoint latency,
+#    error rates and APIKey expiry can be set:
+#
+#      server = MockVSDServer(MockVSD(apikey_lifetime=60))
+#      server.latency['GET /subnets/{id}/vports'] = 0.02
+#      server.error_rate['*'] = 0.01
+#      server.start()
+#
+#    Running the module benchmarks RESTProxyServer against a seeded
+#    enterprise/domain/zone/subnet/vport tree:
+#
+#      python -m nuagetempest.lib.utils.vsd_mock -n 5000 --threads 8 \
+#          --latency 2 --error-rate 0.01
+#
+
+import argparse
+import base64
+import json
+import random
+import re
+import ssl
+import threading
+import time
+import urlparse
+import uuid
+
+from multiprocessing.pool import ThreadPool
+
+from nuagetempest.lib.utils import constants
+from nuagetempest.lib.utils import metrics
+from nuagetempest.lib.utils import restproxy
+from nuagetempest.lib.utils import restproxy_benchmark
+
+BASE_URI = '/nuage/api/v3_0'
+AUTH_RESOURCE = '/me'
+USER = 'csproot'
+PASSWORD = 'csproot'
+ORGANIZATION = 'csp'
+# seconds an APIKey stays valid, None for ever
+APIKEY_LIFETIME = None
+
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<lparen>\() |
+    (?P<rparen>\)) |
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*") |
+    (?P<number>-?\d+(?:\.\d+)?(?![\w.])) |
+    (?P<op>==|!=) |
+    (?P<word>[A-Za-z_][\w.]*)
+    )""", re.VERBOSE)
+
+_KEYWORDS = {'true': True, 'false': False, 'null': None}
+
+
+class FilterSyntaxError(ValueError):
+    pass
+
+
+def _tokenize(expression):
+    tokens = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match:
+            raise FilterSyntaxError('Unexpected %r in filter %r' % (
+                expression[pos:], expression))
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'string':
+            text = re.sub(r'\\(.)', r'\1', text[1:-1])
+        elif kind == 'number':
+            text = float(text) if '.' in text else int(text)
+        tokens.append((kind, text))
+    return tokens
+
+
+def _compare(op, actual, expected):
+    if op in ('IS', '=='):
+        return actual == expected
+    if op == '!=':
+        return actual != expected
+    if op == 'CONTAINS':
+        return actual is not None and expected in actual
+    return actual is not None and ('%s' % actual).startswith(expected)
+
+
+class _FilterParser(object):
+    """Recursive descent parser of VSD predicates:
+
+    expr := term (or term)*, term := factor (and factor)*,
+    factor := ( expr ) | attr op value
+    """
+
+    OPERATORS = ('IS', '==', '!=', 'CONTAINS', 'BEGINSWITH')
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return None, None
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise FilterSyntaxError('Unexpected end of filter %r' %
+                                    self.expression)
+        self.pos += 1
+        return token
+
+    def _keyword(self, word):
+        kind, text = self._peek()
+        if kind == 'word' and text.lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        predicate = self._expr()
+        if self.pos != len(self.tokens):
+            raise FilterSyntaxError('Trailing tokens in filter %r' %
+                                    self.expression)
+        return predicate
+
+    def _expr(self):
+        terms = [self._term()]
+        while self._keyword('or'):
+            terms.append(self._term())
+        if len(terms) == 1:
+            return terms[0]
+        return lambda obj: any(term(obj) for term in terms)
+
+    def _term(self):
+        factors = [self._factor()]
+        while self._keyword('and'):
+            factors.append(self._factor())
+        if len(factors) == 1:
+            return factors[0]
+        return lambda obj: all(factor(obj) for factor in factors)
+
+    def _factor(self):
+        kind, text = self._next()
+        if kind == 'lparen':
+            predicate = self._expr()
+            if self._next()[0] != 'rparen':
+                raise FilterSyntaxError('Missing ) in filter %r' %
+                                        self.expression)
+            return predicate
+        if kind != 'word':
+            raise FilterSyntaxError('Expected an attribute in filter %r' %
+                                    self.expression)
+        attr = text
+        kind, op = self._next()
+        if kind == 'word':
+            op = op.upper()
+        if op not in self.OPERATORS:
+            raise FilterSyntaxError('Unknown operator %s in filter %r' %
+                                    (op, self.expression))
+        kind, value = self._next()
+        if kind == 'word':
+            if value.lower() not in _KEYWORDS:
+                raise FilterSyntaxError('Unquoted value %s in filter %r' %
+                                        (value, self.expression))
+            value = _KEYWORDS[value.lower()]
+        elif kind not in ('string', 'number'):
+            raise FilterSyntaxError('Expected a value in filter %r' %
+                                    self.expression)
+        return lambda obj: _compare(op, obj.get(attr), value)
+
+
+def parse_filter(expression):
+    """Return a predicate on VSD objects for an X-Nuage-Filter value"""
+    return _FilterParser(expression).parse()
+
+
+class MockVSD(object):
+    """In memory VSD object store answering REST requests.
+
+    Every object has an ID, parentID and parentType; children are listed
+    in creation order. Deleting an object deletes its subtree.
+    """
+
+    def __init__(self, user=USER, password=PASSWORD,
+                 apikey_lifetime=APIKEY_LIFETIME, timer=time.time):
+        self.user = user
+        self.password = password
+        self.apikey_lifetime = apikey_lifetime
+        self._timer = timer
+        self._lock = threading.RLock()
+        self.objects = {}
+        self.types = {}
+        self._children = {}
+        # APIKey -> expiry time, None for never
+        self.apikeys = {}
+        self.me = {'ID': str(uuid.uuid4()), 'userName': user,
+                   'enterpriseID': str(uuid.uuid4())}
+
+    def create(self, res_type, data, parent_type=None, parent_id=None):
+        obj = dict(data)
+        obj['ID'] = str(uuid.uuid4())
+        obj['parentID'] = parent_id
+        obj['parentType'] = parent_type[:-1] if parent_type else None
+        with self._lock:
+            self.objects[obj['ID']] = obj
+            self.types[obj['ID']] = res_type
+            self._children.setdefault((parent_id, res_type), []).append(
+                obj['ID'])
+        return obj
+
+    def delete(self, vsd_id):
+        with self._lock:
+            obj = self.objects.pop(vsd_id)
+            res_type = self.types.pop(vsd_id)
+            self._children[(obj['parentID'], res_type)].remove(vsd_id)
+            for key in [key for key in self._children if key[0] == vsd_id]:
+                for child_id in list(self._children[key]):
+                    self.delete(child_id)
+                del self._children[key]
+
+    def children(self, parent_id, res_type):
+        with self._lock:
+            return [self.objects[child_id] for child_id
+                    in self._children.get((parent_id, res_type), [])]
+
+    def seed(self, enterprises=1, domains=2, zones=2, subnets=2, vports=10):
+        """Create an enterprise/domain/zone/subnet/vport tree, return the
+        IDs of the subnets"""
+        subnet_ids = []
+        for e in range(enterprises):
+            ent = self.create(constants.NET_PARTITION,
+                              {'name': 'enterprise-%d' % e})
+            for d in range(domains):
+                dom = self.create(constants.DOMAIN,
+                                  {'name': 'domain-%d' % d,
+                                   'externalID': str(uuid.uuid4())},
+                                  constants.NET_PARTITION, ent['ID'])
+                for z in range(zones):
+                    zone = self.create(constants.ZONE,
+                                       {'name': 'zone-%d' % z},
+                                       constants.DOMAIN, dom['ID'])
+                    for s in range(subnets):
+                        subnet = self.create(
+                            constants.SUBNETWORK,
+                            {'name': 'subnet-%d' % s,
+                             'address': '10.%d.%d.0' % (z, s),
+                             'netmask': '255.255.255.0',
+                             'externalID': str(uuid.uuid4())},
+                            constants.ZONE, zone['ID'])
+                        subnet_ids.append(subnet['ID'])
+                        for v in range(vports):
+                            self.create(
+                                constants.VPORT,
+                                {'name': str(uuid.uuid4()),
+                                 'type': 'VM',
+                                 'addressSpoofing': constants.INHERITED,
+                                 'externalID': str(uuid.uuid4())},
+                                constants.SUBNETWORK, subnet['ID'])
+        return subnet_ids
+
+    def expire_apikeys(self):
+        with self._lock:
+            self.apikeys.clear()
+
+    def _authorized(self, authorization, path):
+        if not authorization or not authorization.startswith('Basic '):
+            return False
+        try:
+            user, secret = base64.b64decode(
+                authorization[len('Basic '):]).split(':', 1)
+        except (TypeError, ValueError):
+            return False
+        if user != self.user:
+            return False
+        if path == AUTH_RESOURCE and secret == self.password:
+            return True
+        with self._lock:
+            if secret not in self.apikeys:
+                return False
+            expiry = self.apikeys[secret]
+            if expiry is not None and expiry <= self._timer():
+                del self.apikeys[secret]
+                return False
+            return True
+
+    def _authenticate(self):
+        apikey = str(uuid.uuid4())
+        expiry = None
+        if self.apikey_lifetime is not None:
+            expiry = self._timer() + self.apikey_lifetime
+        with self._lock:
+            self.apikeys[apikey] = expiry
+        me = dict(self.me, APIKey=apikey,
+                  APIKeyExpiry=int(expiry * 1000) if expiry else None)
+        return 200, [me], {}
+
+    def _list(self, objects, headers):
+        expression = headers.get('x-nuage-filter')
+        if expression:
+            try:
+                predicate = parse_filter(expression)
+            except FilterSyntaxError as e:
+                return 400, {'errors': [{'descriptions': [
+                    {'description': str(e)}]}]}, {}
+            objects = [obj for obj in objects if predicate(obj)]
+        response_headers = {'X-Nuage-Count': str(len(objects))}
+        if 'x-nuage-pagesize' in headers:
+            page = int(headers.get('x-nuage-page') or 0)
+            page_size = int(headers['x-nuage-pagesize'])
+            objects = objects[page * page_size:(page + 1) * page_size]
+            response_headers['X-Nuage-Page'] = str(page)
+            response_headers['X-Nuage-PageSize'] = str(page_size)
+        # the VSD answers an empty listing with an empty body
+        return 200, objects or None, response_headers
+
+    def handle(self, method, path, headers, data):
+        """Return (status, data, response headers) of a request.
+
+        @param path resource path below the base URI, without query
+        @param headers request headers, lower-cased names
+        """
+        if not self._authorized(headers.get('authorization'), path):
+            return 401, None, {}
+        if path == AUTH_RESOURCE and method == 'GET':
+            return self._authenticate()
+
+        parts = [part for part in path.split('/') if part]
+        with self._lock:
+            if len(parts) == 1:
+                parent_type, parent_id, res_type, vsd_id = \
+                    None, None, parts[0], None
+            elif len(parts) == 2:
+                parent_type, parent_id, res_type, vsd_id = \
+                    None, None, parts[0], parts[1]
+            elif len(parts) == 3:
+                parent_type, parent_id, res_type, vsd_id = \
+                    parts[0], parts[1], parts[2], None
+                if parent_id not in self.objects:
+                    return 404, None, {}
+            else:
+                return 404, None, {}
+
+            if vsd_id is not None:
+                if self.types.get(vsd_id) != res_type:
+                    return 404, None, {}
+                if method == 'GET':
+                    return 200, [self.objects[vsd_id]], {}
+                if method == 'PUT':
+                    update = dict((key, value) for key, value
+                                  in (data or {}).items()
+                                  if key not in ('ID', 'parentID',
+                                                 'parentType'))
+                    self.objects[vsd_id].update(update)
+                    return 204, None, {}
+                if method == 'DELETE':
+                    self.delete(vsd_id)
+                    return 204, None, {}
+                return 405, None, {}
+
+            if method == 'GET':
+                return self._list(self.children(parent_id, res_type),
+                                  headers)
+            if method == 'POST':
+                if not isinstance(data, dict):
+                    return 400, None, {}
+                name = data.get('name')
+                if name is not None and any(
+                        obj.get('name') == name for obj
+                        in self.children(parent_id, res_type)):
+                    return 409, {'errors': [{'descriptions': [
+                        {'description': 'Another object exists with the '
+                                        'same name'}]}]}, {}
+                return 201, [self.create(res_type, data, parent_type,
+                                         parent_id)], {}
+            return 405, None, {}
+
+
+class MockVSDRequestHandler(restproxy_benchmark.StubRequestHandler):
+
+    def _reply(self):
+        server = self.server
+        server.count_request()
+        length = int(self.headers.getheader('content-length') or 0)
+        body = self.rfile.read(length) if length else ''
+        if server.take_failure():
+            self.close_connection = 1
+            return
+        path = urlparse.urlparse(self.path).path
+        if path.startswith(server.base_uri):
+            path = path[len(server.base_uri):]
+        endpoint = '%s %s' % (self.command, metrics.normalize_path(path))
+
+        delay = server.stall + server.endpoint_value(server.latency,
+                                                     endpoint)
+        if delay:
+            time.sleep(delay)
+        if server.inject_error(endpoint):
+            status, data, headers = server.error_status, None, {}
+        else:
+            try:
+                data = json.loads(body) if body else None
+            except ValueError:
+                data = None
+            request_headers = dict((name.lower(), value) for name, value
+                                   in self.headers.items())
+            status, data, headers = server.vsd.handle(
+                self.command, path, request_headers, data)
+
+        respstr = json.dumps(data) if data is not None else ''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(respstr)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(respstr)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _reply
+
+
+class MockVSDServer(restproxy_benchmark.StubServer):
+    """Serves a MockVSD with injected latency and errors.
+
+    latency and error_rate map 'METHOD /resource/{id}/template' to
+    seconds and to a probability; '*' applies to other endpoints.
+    """
+
+    def __init__(self, vsd=None, certfile=None, keyfile=None,
+                 base_uri=BASE_URI, seed=None):
+        restproxy_benchmark.StubServer.__init__(
+            self, certfile, keyfile, MockVSDRequestHandler)
+        self.vsd = vsd or MockVSD()
+        self.base_uri = base_uri
+        self.latency = {}
+        self.error_rate = {}
+        self.error_status = 503
+        self.errors = 0
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def endpoint_value(values, endpoint):
+        return values.get(endpoint, values.get('*', 0))
+
+    def inject_error(self, endpoint):
+        rate = self.endpoint_value(self.error_rate, endpoint)
+        if not rate:
+            return False
+        with self._lock:
+            if self._random.random() < rate:
+                self.errors += 1
+                return True
+            return False
+
+
+def _percentile(latencies, q):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+
+def run(proxy, subnet_ids, calls, threads, page_size):
+    """Issue a mix of filtered and paged vport listings"""
+    vports = {}
+    for subnet_id in subnet_ids:
+        listing = proxy.rest_call('GET', '/subnets/%s/vports' % subnet_id,
+                                  '').data
+        vports[subnet_id] = [vport['name'] for vport in listing or []]
+
+    def call(i):
+        rng = random.Random(i)
+        subnet_id = rng.choice(subnet_ids)
+        if i % 2 and vports[subnet_id]:
+            headers = {'X-Nuage-Filter': "name IS '%s'" %
+                       rng.choice(vports[subnet_id])}
+        else:
+            headers = {'X-Nuage-Page': '0',
+                       'X-Nuage-PageSize': str(page_size)}
+        start = time.time()
+        resp = proxy.rest_call('GET', '/subnets/%s/vports' % subnet_id, '',
+                               extra_headers=headers)
+        return time.time() - start, resp.status
+
+    pool = ThreadPool(threads)
+    start = time.time()
+    try:
+        results = pool.map(call, range(calls))
+    finally:
+        pool.close()
+        pool.join()
+    elapsed = time.time() - start
+
+    latencies = sorted(secs for secs, _ in results)
+    statuses = {}
+    for _, status in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {'throughput': calls / elapsed,
+            'mean_ms': 1000 * sum(latencies) / len(latencies),
+            'p50_ms': 1000 * _percentile(latencies, 0.5),
+            'p90_ms': 1000 * _percentile(latencies, 0.9),
+            'p99_ms': 1000 * _percentile(latencies, 0.99),
+            'max_ms': 1000 * latencies[-1],
+            'statuses': statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark RESTProxyServer against a local mock VSD')
+    parser.add_argument('-n', '--calls', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--subnets', type=int, default=4,
+                        help='subnets per zone')
+    parser.add_argument('--vports', type=int, default=50,
+                        help='vports per subnet')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='server latency per request, in ms')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='fraction of requests answered with a 503')
+    parser.add_argument('--apikey-lifetime', type=float,
+                        help='seconds before APIKeys expire')
+    parser.add_argument('--certfile', help='PEM certificate, enables HTTPS')
+    parser.add_argument('--keyfile')
+    args = parser.parse_args()
+
+    serverssl = bool(args.certfile)
+    if serverssl and hasattr(ssl, '_create_unverified_context'):
+        # the mock certificate is self signed
+        ssl._create_default_https_context = ssl._create_unverified_context
+
+    vsd = MockVSD(apikey_lifetime=args.apikey_lifetime)
+    subnet_ids = vsd.seed(subnets=args.subnets, vports=args.vports)
+    server = MockVSDServer(vsd, args.certfile, args.keyfile, seed=0)
+    server.latency['*'] = args.latency / 1000.0
+    server.error_rate['*'] = args.error_rate
+    server.start()
+
+    proxy = restproxy.RESTProxyServer(server.address, BASE_URI, serverssl,
+                                      '%s:%s' % (USER, PASSWORD),
+                                      AUTH_RESOURCE, ORGANIZATION, 30)
+    proxy.pool = restproxy.HTTPConnectionPool(
+        server.server_address[0], server.server_address[1], serverssl, 30,
+        maxsize=args.threads)
+    proxy.generate_nuage_auth()
+    result = run(proxy, subnet_ids, args.calls, args.threads,
+                 args.page_size)
+
+    print('objects: %d, calls: %d, threads: %d' % (
+        len(vsd.objects), args.calls, args.threads))
+    print('throughput: %.1f requests/s' % result['throughput'])
+    print('%10s %10s %10s %10s %10s' % ('mean(ms)', 'p50(ms)', 'p90(ms)',
+                                        'p99(ms)', 'max(ms)'))
+    print('%10.3f %10.3f %10.3f %10.3f %10.3f' % (
+        result['mean_ms'], result['p50_ms'], result['p90_ms'],
+        result['p99_ms'], result['max_ms']))
+    print('statuses: %s' % result['statuses'])
+    print('server requests: %d, injected errors: %d' % (server.requests,
+                                                        server.errors))
+    print('client: %s' % proxy.metrics())
+    proxy.pool.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
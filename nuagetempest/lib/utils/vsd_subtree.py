@@ -0,0 +1,71 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    In-memory index of a prefetched VSD subtree, see
+#    NuageRestClient.prefetch_subtree().
+#
+
+from nuagetempest.lib.utils import constants
+
+# resource type -> child resource types fetched by default
+SUBTREE_CHILDREN = {
+    constants.NET_PARTITION: [constants.DOMAIN, constants.L2_DOMAIN],
+    constants.DOMAIN: [constants.ZONE, constants.POLICYGROUP,
+                       constants.REDIRECTIONTARGETS],
+    constants.ZONE: [constants.SUBNETWORK],
+    constants.SUBNETWORK: [constants.VPORT],
+    constants.L2_DOMAIN: [constants.VPORT, constants.POLICYGROUP,
+                          constants.REDIRECTIONTARGETS],
+    constants.VPORT: [constants.VM_IFACE, constants.BRIDGE_IFACE,
+                      constants.HOST_IFACE, constants.VIRTUAL_IP],
+}
+
+
+class SubtreeIndex(object):
+    """VSD objects indexed by ID, externalID and (parent, type, name)"""
+
+    def __init__(self, external_id=None):
+        #: callable turning a neutron ID into a VSD externalID
+        self._external_id = external_id or (lambda neutron_id: neutron_id)
+        self.by_id = {}
+        self.by_external_id = {}
+        self.by_parent_name = {}
+        self.types = {}
+        self._children = {}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, vsd_id):
+        return vsd_id in self.by_id
+
+    def add(self, res_type, parent_id, obj):
+        """Index obj, return False if it was indexed before"""
+        vsd_id = obj['ID']
+        if vsd_id in self.by_id:
+            return False
+        self.by_id[vsd_id] = obj
+        self.types[vsd_id] = res_type
+        if obj.get('externalID'):
+            self.by_external_id[obj['externalID']] = obj
+        if obj.get('name') is not None:
+            self.by_parent_name[(parent_id, res_type, obj['name'])] = obj
+        self._children.setdefault((parent_id, res_type), []).append(obj)
+        return True
+
+    def get(self, vsd_id):
+        return self.by_id.get(vsd_id)
+
+    def get_by_external_id(self, neutron_id):
+        return self.by_external_id.get(self._external_id(neutron_id))
+
+    def get_child(self, parent_id, res_type, name):
+        return self.by_parent_name.get((parent_id, res_type, name))
+
+    def children(self, parent_id, res_type):
+        return self._children.get((parent_id, res_type), [])
+
+    def of_type(self, res_type):
+        return [self.by_id[vsd_id] for vsd_id, obj_type in self.types.items()
+                if obj_type == res_type]
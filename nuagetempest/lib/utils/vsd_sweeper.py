@@ -0,0 +1,213 @@
+# Copyright 2016 Alcatel-Lucent USA Inc.
+# All Rights Reserved.
+#
+#
+#    Deletes VSD objects leaked by interrupted runs.
+#
+#    An object is an orphan when its externalID carries our nuage_cms_id
+#    but the Neutron resource it was created for no longer exists.
+#    Enterprises are never swept, policygroups only when they back a
+#    security group. Orphans are deleted bottom-up (vports
+#    before subnets before zones before domains before templates) by
+#    concurrent workers, see teardown.TearDown.
+#
+#    Run it before a test run, against the tempest.conf of that run:
+#
+#      python -m nuagetempest.lib.utils.vsd_sweeper --dry-run
+#      python -m nuagetempest.lib.utils.vsd_sweeper --concurrency 16
+#
+
+import argparse
+import re
+import time
+
+from oslo_log import log as logging
+from tempest import clients
+from tempest.common import credentials_factory as credentials
+from tempest import config
+
+from nuagetempest.lib.utils import constants
+from nuagetempest.lib.utils import exceptions as n_exceptions
+from nuagetempest.lib.utils import teardown
+from nuagetempest.services import nuage_client
+
+CONF = config.CONF
+LOG = logging.getLogger(__name__)
+
+CONCURRENCY = 8
+# objects younger than this, in seconds, may belong to a run in progress
+MIN_AGE = 300
+
+# VSD object types searched, per parent type
+SWEEP_CHILDREN = {
+    constants.NET_PARTITION: [constants.DOMAIN, constants.DOMAIN_TEMPLATE,
+                              constants.L2_DOMAIN,
+                              constants.L2_DOMAIN_TEMPLATE],
+    constants.DOMAIN: [constants.ZONE, constants.POLICYGROUP],
+    constants.ZONE: [constants.SUBNETWORK],
+    constants.SUBNETWORK: [constants.VPORT],
+    constants.L2_DOMAIN: [constants.VPORT, constants.POLICYGROUP],
+}
+
+# VSD object type -> Neutron resources its externalID can refer to
+NEUTRON_COUNTERPARTS = {
+    constants.DOMAIN: ('routers',),
+    constants.DOMAIN_TEMPLATE: ('routers',),
+    constants.ZONE: ('routers',),
+    constants.SUBNETWORK: ('subnets',),
+    constants.L2_DOMAIN: ('subnets',),
+    constants.L2_DOMAIN_TEMPLATE: ('subnets',),
+    constants.VPORT: ('ports',),
+    constants.POLICYGROUP: ('security_groups',),
+}
+
+# externalID of a policygroup backing a security group, <SG ID>@<cms_id>;
+# the plugin's other policygroups (e.g. PG_FOR_LESS_SECURITY_*) are never
+# swept, their Neutron resource can not be told from their externalID
+SG_EXTERNAL_ID = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                            r'[0-9a-f]{4}-[0-9a-f]{12}@')
+LESS_SECURITY_PG = 'PG_FOR_LESS_SECURITY_'
+
+
+def list_neutron_ids(manager):
+    """Return Neutron resource -> set of IDs, listed with admin clients"""
+    listings = {
+        'routers': lambda: manager.routers_client.list_routers(fields='id'),
+        'subnets': lambda: manager.subnets_client.list_subnets(fields='id'),
+        'ports': lambda: manager.ports_client.list_ports(fields='id'),
+        'security_groups': lambda: manager.security_groups_client.
+        list_security_groups(fields='id'),
+    }
+    return dict((resource, set(item['id'] for item in listing()[resource]))
+                for resource, listing in listings.items())
+
+
+class Sweeper(object):
+
+    def __init__(self, client, neutron_ids, cms_id,
+                 concurrency=CONCURRENCY, min_age=MIN_AGE, timer=time.time):
+        """@param client NuageRestClient
+        @param neutron_ids dict of Neutron resource -> set of IDs of the
+               existing ones, see list_neutron_ids()
+        """
+        self.client = client
+        # Neutron resource -> externalIDs of the existing ones
+        self.external_ids = dict(
+            (resource, set(client.get_vsd_external_id(neutron_id)
+                           for neutron_id in ids))
+            for resource, ids in neutron_ids.items())
+        self.suffix = '@' + cms_id
+        self.concurrency = concurrency
+        self.min_age = min_age
+        self._timer = timer
+
+    def _is_orphan(self, res_type, obj, now):
+        external_id = obj.get('externalID') or ''
+        if not external_id.endswith(self.suffix):
+            return False
+        if res_type == constants.POLICYGROUP and (
+                not SG_EXTERNAL_ID.match(external_id) or
+                (obj.get('name') or '').startswith(LESS_SECURITY_PG)):
+            return False
+        created = obj.get('creationDate')
+        if created and now - created / 1000.0 < self.min_age:
+            return False
+        return not any(external_id in self.external_ids.get(resource, ())
+                       for resource in NEUTRON_COUNTERPARTS[res_type])
+
+    def find_orphans(self):
+        """Return [(VSD type, object)] of the orphans"""
+        now = self._timer()
+        orphans = []
+        enterprises = self.client.get_global_resource(
+            constants.NET_PARTITION) or []
+        for enterprise in enterprises:
+            index = self.client.prefetch_subtree(
+                constants.NET_PARTITION, enterprise['ID'],
+                child_types=SWEEP_CHILDREN)
+            for vsd_id, res_type in index.types.items():
+                obj = index.get(vsd_id)
+                if (res_type in NEUTRON_COUNTERPARTS and
+                        self._is_orphan(res_type, obj, now)):
+                    LOG.debug('Orphan %s %s (%s)', res_type, vsd_id,
+                              obj['externalID'])
+                    orphans.append((res_type, obj))
+        return orphans
+
+    @staticmethod
+    def report(orphans):
+        counts = {}
+        for res_type, _ in orphans:
+            counts[res_type] = counts.get(res_type, 0) + 1
+        lines = ['%-20s %8d' % (res_type, count)
+                 for res_type, count in sorted(counts.items())]
+        lines.append('%-20s %8d' % ('total', len(orphans)))
+        return '\n'.join(lines)
+
+    def _delete(self, res_type, vsd_id):
+        # without responseChoice VSD answers 300 to deletes that need a
+        # confirmation, and deletes nothing
+        resp = self.client.delete_resource(res_type, vsd_id,
+                                           responseChoice=True)
+        if not 200 <= resp.status < 300:
+            raise n_exceptions.UnexpectedResponseCode(
+                'DELETE %s %s: %s' % (res_type, vsd_id, resp.status))
+
+    def sweep(self, orphans):
+        """Delete orphans bottom-up, return a summary of the sweep"""
+        cleanup = teardown.TearDown(concurrency=self.concurrency)
+        orphan_ids = set(obj['ID'] for _, obj in orphans)
+        after = dict((vsd_id, []) for vsd_id in orphan_ids)
+        for _, obj in orphans:
+            # children go first, and domains before their templates
+            for parent_id in (obj.get('parentID'), obj.get('templateID')):
+                if parent_id in orphan_ids:
+                    after[parent_id].append(obj['ID'])
+        for res_type, obj in orphans:
+            cleanup.add(obj['ID'],
+                        lambda res_type=res_type, vsd_id=obj['ID']:
+                            self._delete(res_type, vsd_id),
+                        after=after[obj['ID']])
+
+        start = self._timer()
+        failures = cleanup.run(raise_errors=False)
+        elapsed = self._timer() - start
+        return {'orphans': len(orphans),
+                'deleted': cleanup.deleted,
+                'failed': len(failures),
+                'conflicts': cleanup.conflicts,
+                'seconds': elapsed,
+                'per_second': cleanup.deleted / elapsed if elapsed else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Delete VSD objects whose Neutron resource is gone')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='only report the orphans')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--min-age', type=float, default=MIN_AGE,
+                        help='skip objects created less than this many '
+                             'seconds ago')
+    args = parser.parse_args()
+
+    manager = clients.Manager(
+        credentials.get_configured_admin_credentials())
+    sweeper = Sweeper(nuage_client.NuageRestClient(),
+                      list_neutron_ids(manager), CONF.nuage.nuage_cms_id,
+                      concurrency=args.concurrency, min_age=args.min_age)
+
+    start = time.time()
+    orphans = sweeper.find_orphans()
+    print('found %d orphans in %.1fs' % (len(orphans), time.time() - start))
+    print(sweeper.report(orphans))
+    if args.dry_run or not orphans:
+        return
+    summary = sweeper.sweep(orphans)
+    print('deleted %(deleted)d of %(orphans)d orphans in %(seconds).1fs '
+          '(%(per_second).1f/s), %(failed)d failed, %(conflicts)d '
+          'conflicts retried' % summary)
+
+
+if __name__ == '__main__':
+    main()
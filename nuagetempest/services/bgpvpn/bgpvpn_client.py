@@ -12,7 +12,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import abc
-import json
 import six
 import urllib
 
@@ -20,6 +19,8 @@ from tempest import config
 from tempest.lib.common import rest_client
 from tempest.lib import exceptions as lib_exc
 
+from nuagetempest.lib.utils import json_codec
+
 
 CONF = config.CONF
 
@@ -58,9 +59,9 @@ class BaseNeutronResourceClient(rest_client.RestClient):
             uri = self.resource_url
 
         resource = kwargs
-        req_post_data = json.dumps({self.resource: resource})
+        req_post_data = json_codec.dumps({self.resource: resource})
         resp, body = self.post(uri, req_post_data)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(201, resp.status)
         return rest_client.ResponseBody(resp, body)[self.resource]
 
@@ -72,7 +73,7 @@ class BaseNeutronResourceClient(rest_client.RestClient):
         if filters:
             uri += '?' + urllib.urlencode(filters, doseq=1)
         resp, body = self.get(uri)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(200, resp.status)
         return rest_client.ResponseBody(resp, body)['%ss' % self.resource]
 
@@ -84,7 +85,7 @@ class BaseNeutronResourceClient(rest_client.RestClient):
         if fields:
             uri += '?' + urllib.urlencode(fields, doseq=1)
         resp, body = self.get(uri)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(200, resp.status)
         return rest_client.ResponseBody(resp, body)[self.resource]
 
@@ -94,9 +95,9 @@ class BaseNeutronResourceClient(rest_client.RestClient):
         else:
             uri = self.single_resource_url % id
         resource = kwargs
-        req_data = json.dumps({self.resource: resource})
+        req_data = json_codec.dumps({self.resource: resource})
         resp, body = self.put(uri, req_data)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(200, resp.status)
         return rest_client.ResponseBody(resp, body)[self.resource]
 
@@ -7,18 +7,29 @@
 #
 #
 
+import atexit
+import collections
+import copy
+import os
 import netaddr
 
 from tempest import config
 from tempest import exceptions
 
+from nuagetempest.lib.utils import cache
+from nuagetempest.lib.utils import cassette
 from nuagetempest.lib.utils import constants
 from nuagetempest.lib.utils import exceptions as n_exceptions
+from nuagetempest.lib.utils import metrics
 from nuagetempest.lib.utils import restproxy
+from nuagetempest.lib.utils import vsd_filter
+from nuagetempest.lib.utils import vsd_subtree
 
 import time
 import re
 import six
+import sys
+from multiprocessing.pool import ThreadPool
 from tempest.lib.common.utils import misc as misc_utils
 from oslo_log import log as logging
 
@@ -27,6 +38,123 @@ SERVERSSL = True
 SERVERTIMEOUT = 30
 RESPONSECHOICE = '?responseChoice=1'
 CMS_ID = None
+BATCH_CONCURRENCY = 8
+READ_CACHE_TTL = 5
+READ_CACHE_MAXSIZE = 1024
+PAGE_SIZE = 500
+LAZY_TRACING = True
+
+# Outcome of one request of NuageRestClient.batch(): either the response
+# or the exception raised while issuing/verifying it.
+BatchResult = collections.namedtuple('BatchResult', ['response', 'error'])
+
+
+_metrics_report_registered = False
+
+
+def _metrics_report_file(filename):
+    """Return filename with the pid before its extension, so the workers
+    of a parallel run each write their own report
+    """
+    root, ext = os.path.splitext(filename)
+    return '%s.%d%s' % (root, os.getpid(), ext)
+
+
+def _register_metrics_report():
+    """Dump REQUEST_METRICS when the run ends, if configured"""
+    global _metrics_report_registered
+    if _metrics_report_registered or not CONF.nuage.nuage_vsd_metrics_file:
+        return
+    atexit.register(metrics.REQUEST_METRICS.dump,
+                    _metrics_report_file(CONF.nuage.nuage_vsd_metrics_file),
+                    CONF.nuage.nuage_vsd_metrics_format)
+    _metrics_report_registered = True
+
+
+def _frame_class_name(frame):
+    cname = ""
+    if 'self' in frame.f_locals:
+        cname = frame.f_locals['self'].__class__.__name__
+    if 'cls' in frame.f_locals:
+        cname = frame.f_locals['cls'].__name__
+    return cname
+
+
+def find_test_caller():
+    """misc_utils.find_test_caller() without inspect and regexes.
+
+    Climbs the stack comparing code names only, and only looks at the
+    locals of the frames that name the caller. Falls back to the full
+    lookup, and its debug log, when no caller is found.
+    """
+    frame = sys._getframe(1)
+    is_cleanup = False
+    caller_name = None
+    while frame is not None:
+        name = frame.f_code.co_name
+        if name.startswith(('test_', 'setUp', 'tearDown')):
+            caller_name = _frame_class_name(frame) + ":" + name
+            break
+        elif name.startswith('_run_cleanup'):
+            is_cleanup = True
+        elif name == 'main':
+            caller_name = 'main'
+            break
+        elif is_cleanup:
+            # cleanups run deep below the test, name them after the first
+            # test class found on the way up
+            cname = _frame_class_name(frame)
+            if cname and not cname.startswith('RunTest'):
+                caller_name = cname + ":_run_cleanups"
+                break
+        frame = frame.f_back
+    # prevents frame leaks
+    del frame
+    if caller_name is None:
+        return misc_utils.find_test_caller()
+    return caller_name
+
+
+class RequestDump(object):
+    """DEBUG dump of a request, formatted only when a handler emits it"""
+    log_fmt = """Request (%s):
+            HTTP %s %s %s%s
+            Request - Headers: %s
+                Body: %s
+            Response - Headers: %s
+                Body: %s"""
+
+    def __init__(self, caller_name, method, req_url, resp, secs,
+                 req_headers, req_body, resp_body):
+        self.caller_name = caller_name
+        self.method = method
+        self.req_url = req_url
+        self.resp = resp
+        self.secs = secs
+        self.req_headers = req_headers
+        self.req_body = req_body
+        self.resp_body = resp_body
+
+    def __str__(self):
+        req_headers = dict(self.req_headers)
+        resp_body = self.resp_body
+        if 'X-Auth-Token' in req_headers:
+            req_headers['X-Auth-Token'] = '<omitted>'
+        if 'X-Nuage-Page' in req_headers:
+            # summarize pages of a listing instead of dumping them
+            resp_body = "<page %s: %d objects>" % (
+                req_headers['X-Nuage-Page'],
+                len(resp_body) if isinstance(resp_body, list) else 0)
+        return self.log_fmt % (
+            self.caller_name,
+            self.resp.status,
+            self.method,
+            self.req_url,
+            self.secs,
+            str(req_headers),
+            safe_body(self.req_body),
+            "Not supported by Nuage REST proxy",
+            safe_body(resp_body))
 
 
 # convert a structure into a string safely
@@ -65,7 +193,25 @@ class NuageRestClient(object):
                                                    serverauth, auth_resource,
                                                    nuage_vsd_org,
                                                    SERVERTIMEOUT)
+        if CONF.nuage.nuage_vsd_cassette:
+            self.restproxy.use_cassette(cassette.get_cassette(
+                CONF.nuage.nuage_vsd_cassette,
+                CONF.nuage.nuage_vsd_cassette_mode,
+                CONF.nuage.nuage_vsd_cassette_match))
         self.restproxy.generate_nuage_auth()
+        _register_metrics_report()
+        self.batch_concurrency = BATCH_CONCURRENCY
+        # cheap caller lookup and deferred DEBUG formatting
+        self.lazy_tracing = LAZY_TRACING
+        # net-partition name -> VSD ID
+        self._netpart_ids = {}
+        self.netpart_cache_hits = 0
+        self.netpart_cache_misses = 0
+        # opt-in cache of GET results, see enable_read_cache()
+        self.read_cache = None
+        # merges identical concurrent GETs, None to disable; writes stop
+        # later GETs from joining the ones they may have made stale
+        self.single_flight = cache.SingleFlight()
 
     @staticmethod
     def _error_checker(resp):
@@ -97,13 +243,20 @@ class NuageRestClient(object):
         if resp.status >= 400:
             raise n_exceptions.UnexpectedResponseCode(str(resp.status))
 
+    def _find_test_caller(self):
+        if self.lazy_tracing:
+            return find_test_caller()
+        return misc_utils.find_test_caller()
+
     def _log_request_start(self, method, req_url, req_headers=None,
                            req_body=None):
         if req_headers is None:
             req_headers = {}
-        caller_name = misc_utils.find_test_caller()
         trace_regex = CONF.debug.trace_requests
-        if trace_regex and re.search(trace_regex, caller_name):
+        if not trace_regex:
+            return
+        caller_name = self._find_test_caller()
+        if re.search(trace_regex, caller_name):
             self.LOG.debug('Starting Request (%s): %s %s' %
                            (caller_name, method, req_url))
 
@@ -111,33 +264,22 @@ class NuageRestClient(object):
                           secs="", req_headers=None,
                           req_body=None, resp_body=None,
                           caller_name=None, extra=None):
-        if 'X-Auth-Token' in req_headers:
-            req_headers['X-Auth-Token'] = '<omitted>'
-        log_fmt = """Request (%s):
-            HTTP %s %s %s%s
-            Request - Headers: %s
-                Body: %s
-            Response - Headers: %s
-                Body: %s"""
-
-        self.LOG.debug(
-            log_fmt % (
-                caller_name,
-                resp.status,
-                method,
-                req_url,
-                secs,
-                str(req_headers),
-                safe_body(req_body),
-                "Not supported by Nuage REST proxy",
-                safe_body(resp_body)),
-            extra=extra)
+        if self.lazy_tracing and not self.LOG.isEnabledFor(logging.DEBUG):
+            return
+        dump = RequestDump(caller_name, method, req_url, resp, secs,
+                           req_headers, req_body, resp_body)
+        if self.lazy_tracing:
+            self.LOG.debug('%s', dump, extra=extra)
+        else:
+            self.LOG.debug(str(dump), extra=extra)
 
     def _log_request(self, method, req_url, resp,
                      secs="", req_headers=None,
                      req_body=None, resp_body=None):
         if req_headers is None:
             req_headers = {}
+        if self.lazy_tracing and not self.LOG.isEnabledFor(logging.INFO):
+            return
 
         # if we have the request id, put it in the right part of the log
         ### extra = dict(request_id=self._get_request_id(resp))
@@ -147,7 +289,7 @@ class NuageRestClient(object):
         # we're going to just provide work around on who is actually
         # providing timings by gracefully adding no content if they don't.
         # Once we're down to 1 caller, clean this up.
-        caller_name = misc_utils.find_test_caller()
+        caller_name = self._find_test_caller()
         if secs:
             secs = " %.3fs" % secs
         self.LOG.info(
@@ -171,6 +313,10 @@ class NuageRestClient(object):
         resp = self.restproxy.rest_call(
             method, url, data=body, extra_headers=extra_headers)
         end = time.time()
+        metrics.REQUEST_METRICS.record(method, url, resp.status, end - start,
+                                       resp.request_size, resp.response_size)
+        if method != 'GET':
+            self._invalidate_reads(url)
 
         self._log_request(method, url, resp, secs=(end - start),
                           req_headers=extra_headers, req_body=body,
@@ -184,8 +330,37 @@ class NuageRestClient(object):
         return self.request('DELETE', url, body, extra_headers)
 
     def get(self, url, extra_headers=None, body=None):
-        resp = self.request('GET', url, extra_headers=extra_headers)
-        return resp.data
+        key = None
+        if self.read_cache is not None:
+            key = self._read_cache_key(url, extra_headers)
+        if key:
+            data = self.read_cache.get(key)
+            if data is not None:
+                return copy.deepcopy(data)
+            read_cache = self.read_cache
+            # a write invalidating key during the GET bumps the token
+            token = read_cache.reserve(key)
+        try:
+            data = self._get(url, extra_headers)
+        except Exception:
+            if key:
+                read_cache.release(key)
+            raise
+        if key:
+            read_cache.set(key, copy.deepcopy(data), token)
+        return data
+
+    def _get(self, url, extra_headers):
+        if self.single_flight is None:
+            return self.request('GET', url, extra_headers=extra_headers).data
+        flight_key = (url, tuple(sorted((extra_headers or {}).items())))
+        data, shared = self.single_flight.do(
+            flight_key,
+            lambda: self.request('GET', url,
+                                 extra_headers=extra_headers).data)
+        if shared:
+            data = copy.deepcopy(data)
+        return data
 
     def post(self, url, body, extra_headers=None):
         resp = self.request('POST', url, body, extra_headers)
@@ -194,8 +369,113 @@ class NuageRestClient(object):
     def put(self, url, body, extra_headers=None):
         return self.request('PUT', url, body, extra_headers)
 
+    # Read cache
+    def enable_read_cache(self, ttl=READ_CACHE_TTL,
+                          maxsize=READ_CACHE_MAXSIZE):
+        """Serve repeated GETs from a TTL/LRU cache.
+
+        Entries are keyed on resource path and X-Nuage-Filter, and are
+        invalidated whenever a POST, PUT or DELETE is issued on the same
+        path, one of its ancestors or descendants, or on an object of the
+        listed type.
+        """
+        self.read_cache = cache.TTLCache(maxsize, ttl)
+
+    def disable_read_cache(self):
+        self.read_cache = None
+
     @staticmethod
-    def get_extra_headers(attr, attr_value):
+    def _read_cache_key(url, extra_headers):
+        nuage_filter = None
+        for header, value in (extra_headers or {}).items():
+            if header.lower() == 'x-nuage-filter':
+                nuage_filter = value
+            elif header.lower() != 'x-nuage-filtertype':
+                # paging and other headers are not part of the key
+                return None
+        return url, nuage_filter
+
+    def _invalidate_reads(self, url):
+        """Forget the GETs a write on url may have made stale.
+
+        Cached results are dropped, GETs in flight are not joined anymore
+        and do not store their result in the read cache.
+        """
+        path = url.split('?')[0].rstrip('/')
+        segments = path.strip('/').split('/')
+        # /type or /parent/id/type is a listing, /type/id is an object
+        res_type = segments[-1] if len(segments) % 2 else segments[-2]
+
+        def is_stale(key):
+            cached = key[0].split('?')[0].rstrip('/')
+            return (cached == path or
+                    cached.startswith(path + '/') or
+                    path.startswith(cached + '/') or
+                    cached.rsplit('/', 1)[-1] == res_type)
+
+        if self.read_cache is not None:
+            self.read_cache.invalidate(is_stale)
+        if self.single_flight is not None:
+            self.single_flight.forget(is_stale)
+
+    def _batch_request(self, req):
+        method, url = req[0], req[1]
+        extra_headers = req[2] if len(req) > 2 else None
+        body = req[3] if len(req) > 3 else None
+        try:
+            return BatchResult(
+                self.request(method, url, body, extra_headers), None)
+        except Exception as e:
+            return BatchResult(None, e)
+
+    def batch(self, requests, concurrency=None):
+        """Issue independent requests concurrently.
+
+        @param requests iterable of (method, url[, extra_headers[, body]])
+        @param concurrency max number of requests in flight, defaults to
+               self.batch_concurrency
+        @return list of BatchResult, in the order of requests
+        """
+        requests = list(requests)
+        if not requests:
+            return []
+        concurrency = min(concurrency or self.batch_concurrency,
+                          len(requests))
+        if concurrency <= 1:
+            return [self._batch_request(req) for req in requests]
+        pool = ThreadPool(concurrency)
+        try:
+            return pool.map(self._batch_request, requests)
+        finally:
+            pool.close()
+            pool.join()
+
+    def gather(self, urls, extra_headers=None, concurrency=None):
+        """GET many urls concurrently and return their data in order.
+
+        The first error, in the order of urls, is raised.
+        """
+        results = self.batch([('GET', url, extra_headers) for url in urls],
+                             concurrency)
+        for result in results:
+            if result.error:
+                raise result.error
+        return [result.response.data for result in results]
+
+    @staticmethod
+    def _filter_value(attr, value):
+        if attr == 'externalID':
+            return NuageRestClient.get_vsd_external_id(value)
+        return value
+
+    @staticmethod
+    def get_extra_headers(attr, attr_value=None):
+        """Filter headers for attr IS attr_value.
+
+        attr may also be a vsd_filter.Filter, attr_value is then ignored.
+        """
+        if isinstance(attr, vsd_filter.Filter):
+            return attr.headers(NuageRestClient._filter_value)
         headers = {}
         headers['X-NUAGE-FilterType'] = "predicate"
         if attr == 'externalID':
@@ -232,9 +512,9 @@ class NuageRestClient(object):
         if not netpart_name:
             netpart_name = self.def_netpart_name
 
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
         res_path = self.build_resource_path(
-            resource=constants.NET_PARTITION, resource_id=net_part[0]['ID'],
+            resource=constants.NET_PARTITION, resource_id=netpart_id,
             child_resource=resource)
         if filters:
             extra_headers = self.get_extra_headers(filters, filter_value)
@@ -250,6 +530,80 @@ class NuageRestClient(object):
             extra_headers = self.get_extra_headers(filters, filter_value)
         return self.get(res_path, extra_headers)
 
+    def iter_get(self, url, extra_headers=None, page_size=PAGE_SIZE):
+        """Generator over the objects of a listing, fetched page by page.
+
+        Pages are requested with the X-Nuage-Page/X-Nuage-PageSize
+        headers, so only one page is held in memory at a time and callers
+        can stop early.
+        """
+        page = 0
+        fetched = 0
+        while True:
+            headers = dict(extra_headers or {})
+            headers['X-Nuage-Page'] = str(page)
+            headers['X-Nuage-PageSize'] = str(page_size)
+            resp = self.request('GET', url, extra_headers=headers)
+            objects = resp.data if isinstance(resp.data, list) else []
+            for obj in objects:
+                yield obj
+            fetched += len(objects)
+            count = resp.headers.get('x-nuage-count')
+            if (len(objects) < page_size or
+                    (count is not None and fetched >= int(count))):
+                return
+            page += 1
+
+    def iter_child_resource(self, resource, resource_id, child_resource,
+                            filters=None, filter_value=None,
+                            page_size=PAGE_SIZE):
+        extra_headers = None
+        res_path = self.build_resource_path(
+            resource, resource_id,
+            child_resource)
+        if filters:
+            extra_headers = self.get_extra_headers(filters, filter_value)
+        return self.iter_get(res_path, extra_headers, page_size)
+
+    def prefetch_subtree(self, root_type, root_id, depth=None,
+                         child_types=None):
+        """Fetch a VSD subtree level by level with concurrent requests.
+
+        @param depth number of levels below the root to fetch, all
+               levels if None
+        @param child_types dict of resource type -> child types to fetch,
+               defaults to vsd_subtree.SUBTREE_CHILDREN
+        @return vsd_subtree.SubtreeIndex of the root and its descendants
+        """
+        if child_types is None:
+            child_types = vsd_subtree.SUBTREE_CHILDREN
+        index = vsd_subtree.SubtreeIndex(self.get_vsd_external_id)
+        root = self.get(self.build_resource_path(root_type, root_id))
+        for obj in root or []:
+            index.add(root_type, None, obj)
+        level = [(root_type, root_id)]
+        hops = 0
+        while level and (depth is None or hops < depth):
+            fetches = [(parent_type, parent_id, child_type)
+                       for parent_type, parent_id in level
+                       for child_type in child_types.get(parent_type, [])]
+            results = self.batch(
+                [('GET', self.build_resource_path(*fetch))
+                 for fetch in fetches])
+            level = []
+            for (_, parent_id, child_type), result in zip(fetches, results):
+                if result.error:
+                    raise result.error
+                objects = result.response.data
+                if not isinstance(objects, list):
+                    # empty listings come back as 204 without a body
+                    continue
+                for obj in objects:
+                    if index.add(child_type, parent_id, obj):
+                        level.append((child_type, obj['ID']))
+            hops += 1
+        return index
+
     def delete_resource(self, resource, resource_id, responseChoice=False):
         res_path = self.build_resource_path(resource, resource_id)
         if responseChoice:
@@ -266,16 +620,35 @@ class NuageRestClient(object):
         if extra_params:
             data.update(extra_params)
         res_path = self.build_resource_path(constants.NET_PARTITION)
+        self._netpart_ids.pop(name, None)
         return self.post(res_path, data)
 
-    def delete_net_partition(self):
-        pass
+    def delete_net_partition(self, net_part_id):
+        for name, cached_id in list(self._netpart_ids.items()):
+            if cached_id == net_part_id:
+                del self._netpart_ids[name]
+        return self.delete_resource(constants.NET_PARTITION, net_part_id)
 
     def get_net_partition(self, net_part_name):
         res_path = self.build_resource_path(constants.NET_PARTITION)
         extra_headers = self.get_extra_headers('name', net_part_name)
         return self.get(res_path, extra_headers)
 
+    def get_net_partition_id(self, net_part_name):
+        """Return the VSD ID of a net-partition, cached by name"""
+        net_part_id = self._netpart_ids.get(net_part_name)
+        if net_part_id:
+            self.netpart_cache_hits += 1
+            return net_part_id
+        self.netpart_cache_misses += 1
+        net_part = self.get_net_partition(net_part_name)
+        if not net_part:
+            raise n_exceptions.NotFound(
+                "Net-partition %s not found" % net_part_name)
+        net_part_id = net_part[0]['ID']
+        self._netpart_ids[net_part_name] = net_part_id
+        return net_part_id
+
     # Network
     # EnterpriseNetworkMacro
     def get_enterprise_net_macro(self, filters=None, filter_value=None,
@@ -305,10 +678,10 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
 
         res_path = self.build_resource_path(
-            constants.NET_PARTITION, net_part[0]['ID'],
+            constants.NET_PARTITION, netpart_id,
             constants.DOMAIN_TEMPLATE)
         return self.post(res_path, data)
 
@@ -334,9 +707,9 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
         res_path = self.build_resource_path(
-            constants.NET_PARTITION, net_part[0]['ID'],
+            constants.NET_PARTITION, netpart_id,
             constants.DOMAIN)
         return self.post(res_path, data)
 
@@ -428,10 +801,6 @@ class NuageRestClient(object):
             data['externalID'] = self.get_vsd_external_id(externalId)
         if update_params:
             data.update(update_params)
-        if not netpart_name:
-            netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
-
         res_path = self.build_resource_path(constants.SUBNETWORK, subnet_id, None)
         return self.put(res_path, data)
 
@@ -549,10 +918,10 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
 
         res_path = self.build_resource_path(
-            constants.NET_PARTITION, net_part[0]['ID'],
+            constants.NET_PARTITION, netpart_id,
             constants.L2_DOMAIN_TEMPLATE)
         return self.post(res_path, data)
 
@@ -588,10 +957,10 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
 
         res_path = self.build_resource_path(
-            constants.NET_PARTITION, net_part[0]['ID'],
+            constants.NET_PARTITION, netpart_id,
             constants.L2_DOMAIN)
         return self.post(res_path, data)
 
@@ -604,10 +973,6 @@ class NuageRestClient(object):
             data['externalID'] = self.get_vsd_external_id(externalId)
         if update_params:
             data.update(update_params)
-        if not netpart_name:
-            netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
-
         res_path = self.build_resource_path(
             constants.L2_DOMAIN, l2domain_id,
             None)
@@ -1215,10 +1580,10 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
 
         res_path = self.build_resource_path(
-            constants.NET_PARTITION, net_part[0]['ID'],
+            constants.NET_PARTITION, netpart_id,
             constants.DOMAIN_TEMPLATE)
         return self.post(res_path, data)
 
@@ -1234,9 +1599,9 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
         res_path = self.build_resource_path(
-            constants.NET_PARTITION, net_part[0]['ID'],
+            constants.NET_PARTITION, netpart_id,
             constants.DOMAIN)
         return self.post(res_path, data)
 
@@ -1254,10 +1619,10 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
         res_path = self.build_resource_path(
             constants.NET_PARTITION,
-            resource_id=net_part[0]['ID'],
+            resource_id=netpart_id,
             child_resource=constants.APPLICATION)
         return self.post(res_path, data)
 
@@ -1326,9 +1691,9 @@ class NuageRestClient(object):
             data.update(extra_params)
         if not netpart_name:
             netpart_name = self.def_netpart_name
-        net_part = self.get_net_partition(netpart_name)
+        netpart_id = self.get_net_partition_id(netpart_name)
         res_path = self.build_resource_path(
-            constants.NET_PARTITION, net_part[0]['ID'],
+            constants.NET_PARTITION, netpart_id,
             constants.SERVICE)
         return self.post(res_path, data)
 
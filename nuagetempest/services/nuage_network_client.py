@@ -17,11 +17,10 @@
 #     DO not use this file for writing the new tests.
 #    ----------------------------------------------------------
 #
-import json
-
 from tempest.services.network.json import network_client
 from tempest.lib.common import rest_client as service_client
 import nuagetempest.lib.utils.constants as constants
+from nuagetempest.lib.utils import json_codec
 
 
 class NuageNetworkClientJSON(network_client.NetworkClient):
@@ -29,7 +28,7 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
     def _get_request(self, uri):
         resp, body = self.get(uri)
         self.expected_success(200, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def list_gateways(self):
@@ -100,20 +99,20 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
 
     def create_gateway_vlan(self, **kwargs):
         post_body = {'nuage_gateway_vlan': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-gateway-vlans' % (self.uri_prefix)
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def create_gateway_vport(self, **kwargs):
         post_body = {'nuage_gateway_vport': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-gateway-vports' % (self.uri_prefix)
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def delete_gateway_vlan(self, id):
@@ -125,11 +124,11 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
     # Add redirect target
     def create_redirection_target(self, **kwargs):
         post_body = {'nuage_redirect_target': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-redirect-targets' % (self.uri_prefix)
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def delete_redirection_target(self, id):
@@ -155,21 +154,21 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
     # Add redirect target VIP
     def create_redirection_target_vip(self, **kwargs):
         post_body = {'nuage_redirect_target_vip': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-redirect-target-vips' % (self.uri_prefix)
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     # Add redirect target rules
     def create_redirection_target_rule(self, **kwargs):
         post_body = {'nuage_redirect_target_rule': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-redirect-target-rules' % (self.uri_prefix)
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def delete_redirection_target_rule(self, id):
@@ -180,11 +179,11 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
 
     def assign_gateway_vlan(self, id, **kwargs):
         post_body = {'nuage_gateway_vlan': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-gateway-vlans/%s' % (self.uri_prefix, id)
         resp, body = self.put(uri, body)
         self.expected_success(200, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return resp, body
 
     def list_gateway_vport(self, subnet_id):
@@ -200,11 +199,11 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
     def create_netpartition(self, name, **kwargs):
         post_body = {'net_partition': kwargs}
         post_body['net_partition']['name'] = name
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/net-partitions' % (self.uri_prefix)
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def delete_netpartition(self, id):
@@ -217,7 +216,7 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
         uri = '%s/net-partitions' % (self.uri_prefix)
         resp, body = self.get(uri)
         self.expected_success(200, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def list_tiers(self, app_id):
@@ -230,11 +229,11 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
 
     def create_nuage_external_security_group(self, **kwargs):
         post_body = {'nuage_external_security_group': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-external-security-groups' % self.uri_prefix
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def delete_nuage_external_security_group(self, security_group_id):
@@ -247,11 +246,11 @@ class NuageNetworkClientJSON(network_client.NetworkClient):
 
     def create_nuage_external_security_group_rule(self, **kwargs):
         post_body = {'nuage_external_security_group_rule': kwargs}
-        body = json.dumps(post_body)
+        body = json_codec.dumps(post_body)
         uri = '%s/nuage-external-security-group-rules' % self.uri_prefix
         resp, body = self.post(uri, body)
         self.expected_success(201, resp.status)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         return service_client.ResponseBody(resp, body)
 
     def delete_nuage_external_security_group_rule(self, security_group_rule_id):
@@ -1,5 +1,4 @@
 import abc
-import json
 import six
 import urllib
 
@@ -7,6 +6,8 @@ from tempest import config
 from tempest.lib.common import rest_client
 from tempest.lib import exceptions as lib_exc
 
+from nuagetempest.lib.utils import json_codec
+
 
 CONF = config.CONF
 
@@ -50,9 +51,9 @@ class BaseNeutronResourceClient(rest_client.RestClient):
             uri = self.resource_url
 
         resource = kwargs
-        req_post_data = json.dumps({self.resource: resource})
+        req_post_data = json_codec.dumps({self.resource: resource})
         resp, body = self.post(uri, req_post_data)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(201, resp.status)
         return rest_client.ResponseBody(resp, body)[self.resource]
 
@@ -64,7 +65,7 @@ class BaseNeutronResourceClient(rest_client.RestClient):
         if filters:
             uri += '?' + urllib.urlencode(filters, doseq=1)
         resp, body = self.get(uri)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(200, resp.status)
         if self.resource[-1] == 'y':
             return rest_client.ResponseBody(
@@ -81,7 +82,7 @@ class BaseNeutronResourceClient(rest_client.RestClient):
         if fields:
             uri += '?' + urllib.urlencode(fields, doseq=1)
         resp, body = self.get(uri)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(200, resp.status)
         return rest_client.ResponseBody(resp, body)[self.resource]
 
@@ -91,9 +92,9 @@ class BaseNeutronResourceClient(rest_client.RestClient):
         else:
             uri = self.single_resource_url % id
         resource = kwargs
-        req_data = json.dumps({self.resource: resource})
+        req_data = json_codec.dumps({self.resource: resource})
         resp, body = self.put(uri, req_data)
-        body = json.loads(body)
+        body = json_codec.loads(body)
         self.expected_success(200, resp.status)
         return rest_client.ResponseBody(resp, body)[self.resource]
 
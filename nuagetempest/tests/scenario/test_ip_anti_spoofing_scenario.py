@@ -8,9 +8,10 @@ from nuagetempest.lib.openstackData import openstackData
 from nuagetempest.tests.api import test_ip_anti_spoofing as antispoof
 from tempest.scenario import manager
 from tempest.api.compute import base as serv_base
-import time
+from nuagetempest.lib.utils import poller
 
 import netaddr
+import re
 
 class IpAntiSpoofingTestScenario(antispoof.IpAntiSpoofingTestBase,
                                  manager.NetworkScenarioTest,
@@ -19,6 +20,28 @@ class IpAntiSpoofingTestScenario(antispoof.IpAntiSpoofingTestBase,
     @classmethod
     def resource_setup(cls):
         super(IpAntiSpoofingTestScenario, cls).resource_setup() 
+
+    def _wait_for_vip(self, vip, timeout=60):
+        """Wait until the VSC reports the VIP of the VM port and the VRS
+        has its anti-spoofing flow
+        """
+        def vrs_flows():
+            return self.TB.vrs_1.cmd(
+                'ovs-appctl bridge/dump-flows alubr0 | grep table_id=60')[0]
+
+        def vsc_vport():
+            return self.TB.vsc_1.cmd(
+                'show vswitch-controller vports type vm detail')
+
+        vip_poller = poller.Poller(timeout=timeout)
+        vip_poller.wait_for_all([
+            (vrs_flows, lambda flows: any(vip in flow
+                                          for flow in flows or []),
+             'vrs vip flow'),
+            (vsc_vport, lambda lines: any(
+                re.search(r'No\. of Virtual IP\s*:\s*1', line or '')
+                for line in lines or []),
+             'vsc vport vip')])
         
     def test_vm_in_sec_disabled_port_l2domain(self):
         ''' L2domain testcase to spawn VM in port with
@@ -100,7 +123,7 @@ class IpAntiSpoofingTestScenario(antispoof.IpAntiSpoofingTestBase,
         self.assertEqual(port['mac_address'],
             vm['addresses'][network['name']][0]['OS-EXT-IPS-MAC:mac_addr'])
         self.assertEqual(vm['status'], 'ACTIVE')
-        time.sleep(30)
+        self._wait_for_vip(ip_address)
         tag_name = 'verify_vm_vip_and_anit_spoof_l3domain'
         nuage_ext.nuage_extension.nuage_components(
             nuage_ext._generate_tag(tag_name, self.__class__.__name__), self)
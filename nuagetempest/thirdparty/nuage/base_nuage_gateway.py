@@ -14,6 +14,7 @@
 #
 
 from nuagetempest.lib.utils import constants as n_constants
+from nuagetempest.lib.utils import teardown
 from nuagetempest.services.nuage_client import NuageRestClient
 from nuagetempest.services.nuage_network_client import NuageNetworkClientJSON
 
@@ -168,72 +169,67 @@ class BaseNuageGatewayTest(base.BaseAdminNetworkTest):
 
 
     @classmethod
-    def resource_cleanup(cls):
-        has_exception = False
-
-        for vport in cls.gatewayvports:
-            try:
-                if vport['type'] == n_constants.HOST_VPORT:
-                    cls.nuage_vsd_client.delete_host_interface(
-                        vport['interface'])
-                elif vport['type'] == n_constants.BRIDGE_VPORT:
-                    cls.nuage_vsd_client.delete_bridge_interface(
-                        vport['interface'])
-                cls.nuage_vsd_client.delete_host_vport(vport['id'])
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for vlan in cls.gatewayvlans:
-            try:
-                if 'id' in vlan:
-                    vlan_id = vlan['id']
-                else:
-                    vlan_id = vlan[0]['ID']
-                cls.nuage_vsd_client.delete_vlan_permission(vlan_id)
-                cls.nuage_vsd_client.delete_gateway_vlan(vlan_id)
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for port in cls.gatewayports:
-            try:
-                cls.nuage_vsd_client.delete_gateway_port(port[0]['ID'])
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
+    def _delete_gateway_vport(cls, vport):
+        if vport['type'] == n_constants.HOST_VPORT:
+            cls.nuage_vsd_client.delete_host_interface(vport['interface'])
+        elif vport['type'] == n_constants.BRIDGE_VPORT:
+            cls.nuage_vsd_client.delete_bridge_interface(vport['interface'])
+        cls.nuage_vsd_client.delete_host_vport(vport['id'])
 
-        for gateway in cls.gateways:
-            try:
-                cls.nuage_vsd_client.delete_gateway(gateway[0]['ID'])
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for router_interface in cls.router_interfaces:
-            try:
-                cls.admin_routers_client.remove_router_interface(router_interface['id'],
-                                                         subnet_id=router_interface['subnet_id'])
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for router in cls.routers:
-            try:
-                cls.admin_routers_client.delete_router(router['id'])
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
+    @classmethod
+    def _delete_gateway_vlan(cls, vlan):
+        if 'id' in vlan:
+            vlan_id = vlan['id']
+        else:
+            vlan_id = vlan[0]['ID']
+        cls.nuage_vsd_client.delete_vlan_permission(vlan_id)
+        cls.nuage_vsd_client.delete_gateway_vlan(vlan_id)
+
+    @classmethod
+    def resource_cleanup(cls):
+        cleanup = teardown.TearDown()
+        vports = cleanup.add_all('gateway-vport', cls.gatewayvports,
+                                 cls._delete_gateway_vport)
+        vlans = cleanup.add_all('gateway-vlan', cls.gatewayvlans,
+                                cls._delete_gateway_vlan, after=vports)
+        ports = cleanup.add_all(
+            'gateway-port', cls.gatewayports,
+            lambda port: cls.nuage_vsd_client.delete_gateway_port(
+                port[0]['ID']),
+            after=vlans)
+        cleanup.add_all(
+            'gateway', cls.gateways,
+            lambda gateway: cls.nuage_vsd_client.delete_gateway(
+                gateway[0]['ID']),
+            after=ports)
+
+        # the gateway vports are on the subnets of the router interfaces
+        interfaces = {}
+        for i, interface in enumerate(cls.router_interfaces):
+            key = cleanup.add(
+                'router-interface-%d' % i,
+                lambda interface=interface:
+                    cls.admin_routers_client.remove_router_interface(
+                        interface['id'], subnet_id=interface['subnet_id']),
+                after=vports + vlans)
+            interfaces.setdefault(interface['id'], []).append(key)
+        for i, router in enumerate(cls.routers):
+            cleanup.add('router-%d' % i,
+                        lambda router=router:
+                            cls.admin_routers_client.delete_router(
+                                router['id']),
+                        after=interfaces.get(router['id'], []))
+        failures = cleanup.run(raise_errors=False)
 
         super(BaseNuageGatewayTest, cls).resource_cleanup()
         try:
             cls.client.delete_netpartition(cls.nondef_netpart['id'])
         except Exception as exc:
             LOG.exception(exc)
-            has_exception = True
-            
-        if has_exception:
-            raise exceptions.TearDownException()
+            failures.append(('netpartition', exc))
+
+        if failures:
+            raise exceptions.TearDownException(num=len(failures))
 
     def verify_gateway_properties(self, actual_gw, expected_gw):
         self.assertEqual(actual_gw['ID'], expected_gw['id'])
@@ -14,6 +14,7 @@
 #
 
 from nuagetempest.lib.utils import constants
+from nuagetempest.lib.utils import teardown
 from nuagetempest.services.nuage_client import NuageRestClient
 from oslo_log import log as logging
 from tempest.common.utils import data_utils
@@ -119,66 +120,33 @@ class NuageAppdTestJSON(test_netpartitions.NetPartitionTestJSON):
 
     @classmethod
     def resource_cleanup(cls):
-        has_exception = False
-
-        for flow in cls.flow:
-            try:
-                uri = '/flows/' + flow['id']
-                cls.client.delete_resource(uri)
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for appdport in cls.appdport:
-            try:
-                uri = '/appdports/' + appdport['id']
-                cls.client.delete_resource(uri)
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for tier in cls.tier:
-            try:
-                uri = '/tiers/' + tier['id']
-                cls.client.delete_resource(uri)
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for app in cls.application:
-            try:
-                uri = '/applications/' + app['id']
-                cls.client.delete_resource(uri)
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for app_domain in cls.app_domain:
-            try:
-                uri = '/application-domains/' + app_domain['id']
-                cls.client.delete_resource(uri)
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for vsd_l3dom_template in cls.vsd_l3dom_template:
-            try:
-                cls.nuageclient.delete_l3domaintemplate(
-                    vsd_l3dom_template[0]['ID'])
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        for svc in cls.service:
-            try:
-                uri = '/services/' + svc['id']
-                cls.client.delete_resource(uri)
-            except Exception as exc:
-                LOG.exception(exc)
-                has_exception = True
-
-        if has_exception:
-            raise exceptions.TearDownException()
+        def delete_uri(path):
+            return lambda resource: cls.client.delete_resource(
+                path + resource['id'])
+
+        cleanup = teardown.TearDown()
+        flows = cleanup.add_all('flow', cls.flow, delete_uri('/flows/'))
+        appdports = cleanup.add_all('appdport', cls.appdport,
+                                    delete_uri('/appdports/'), after=flows)
+        tiers = cleanup.add_all('tier', cls.tier, delete_uri('/tiers/'),
+                                after=flows + appdports)
+        applications = cleanup.add_all('application', cls.application,
+                                       delete_uri('/applications/'),
+                                       after=tiers)
+        app_domains = cleanup.add_all('application-domain', cls.app_domain,
+                                      delete_uri('/application-domains/'),
+                                      after=applications)
+        cleanup.add_all(
+            'l3domaintemplate', cls.vsd_l3dom_template,
+            lambda template: cls.nuageclient.delete_l3domaintemplate(
+                template[0]['ID']),
+            after=app_domains)
+        cleanup.add_all('service', cls.service, delete_uri('/services/'),
+                        after=flows)
+        failures = cleanup.run(raise_errors=False)
+
+        if failures:
+            raise exceptions.TearDownException(num=len(failures))
 
         super(NuageAppdTestJSON, cls).resource_cleanup()
 
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from nuagetempest.lib.utils import teardown
 from nuagetempest.services.nuage_client import NuageRestClient
 from tempest.api.network import base
 from tempest import config
@@ -41,30 +42,38 @@ class BaseVSDManagedNetworksTest(base.BaseNetworkTest):
     @classmethod
     def resource_cleanup(cls):
         super(BaseVSDManagedNetworksTest, cls).resource_cleanup()
-        for vsd_l2domain in cls.vsd_l2domain:
-            cls.nuageclient.delete_l2domain(vsd_l2domain[0]['ID'])
-
-        for vsd_l2dom_template in cls.vsd_l2dom_template:
-            cls.nuageclient.delete_l2domaintemplate(
-                vsd_l2dom_template[0]['ID'])
-
-        for vsd_subnet in cls.vsd_subnet:
-            cls.nuageclient.delete_domain_subnet(vsd_subnet[0]['ID'])
-
-        for vsd_zone in cls.vsd_zone:
-            cls.nuageclient.delete_zone(vsd_zone[0]['ID'])
-
-        for vsd_l3domain in cls.vsd_l3domain:
-            cls.nuageclient.delete_domain(vsd_l3domain[0]['ID'])
-
-        for vsd_l3dom_template in cls.vsd_l3dom_template:
-            cls.nuageclient.delete_l3domaintemplate(
-                vsd_l3dom_template[0]['ID'])
-
-        for vsd_shared_subnet in cls.vsd_shared_subnet:
-            resource = ('/sharednetworkresources/%s?responseChoice=1' %
-                        vsd_shared_subnet[0]['ID'])
-            cls.nuageclient.restproxy.rest_call('DELETE', resource, '')
+        client = cls.nuageclient
+        cleanup = teardown.TearDown()
+        l2domains = cleanup.add_all(
+            'l2domain', cls.vsd_l2domain,
+            lambda l2domain: client.delete_l2domain(l2domain[0]['ID']))
+        cleanup.add_all(
+            'l2domaintemplate', cls.vsd_l2dom_template,
+            lambda template: client.delete_l2domaintemplate(
+                template[0]['ID']),
+            after=l2domains)
+        subnets = cleanup.add_all(
+            'subnet', cls.vsd_subnet,
+            lambda subnet: client.delete_domain_subnet(subnet[0]['ID']))
+        zones = cleanup.add_all(
+            'zone', cls.vsd_zone,
+            lambda zone: client.delete_zone(zone[0]['ID']), after=subnets)
+        l3domains = cleanup.add_all(
+            'l3domain', cls.vsd_l3domain,
+            lambda l3domain: client.delete_domain(l3domain[0]['ID']),
+            after=zones)
+        cleanup.add_all(
+            'l3domaintemplate', cls.vsd_l3dom_template,
+            lambda template: client.delete_l3domaintemplate(
+                template[0]['ID']),
+            after=l3domains)
+        cleanup.add_all(
+            'sharednetworkresource', cls.vsd_shared_subnet,
+            lambda shared: client.restproxy.rest_call(
+                'DELETE', '/sharednetworkresources/%s?responseChoice=1' %
+                shared[0]['ID'], ''),
+            after=l2domains + subnets)
+        cleanup.run()
 
     @classmethod
     def create_vsd_dhcpmanaged_l2dom_template(cls, **kwargs):
@@ -24,6 +24,7 @@ from tempest.scenario import manager
 
 from nuagetempest.services.nuage_network_client import NuageNetworkClientJSON
 from nuagetempest.lib.utils import constants
+from nuagetempest.lib.utils import teardown
 
 from nuagetempest.services import nuage_client
 
@@ -74,29 +75,39 @@ class BaseVSDManagedNetwork(base.BaseAdminNetworkTest,
         # cleanup the OpenStack managed objects first
         super(BaseVSDManagedNetwork, cls).resource_cleanup()
 
-        for vsd_policy_group in cls.vsd_policy_groups:
-            cls.nuage_vsd_client.delete_policygroup(vsd_policy_group[0]['id'])
-
-        for vsd_l2domain in cls.vsd_l2domains:
-            cls.nuage_vsd_client.delete_l2domain(vsd_l2domain[0]['ID'])
-
-        for vsd_l2dom_template in cls.vsd_l2dom_templates:
-            cls.nuage_vsd_client.delete_l2domaintemplate(vsd_l2dom_template[0]['ID'])
-
-        for vsd_subnet in cls.vsd_subnets:
-            cls.nuage_vsd_client.delete_domain_subnet(vsd_subnet[0]['ID'])
-
-        for vsd_zone in cls.vsd_zones:
-            cls.nuage_vsd_client.delete_zone(vsd_zone[0]['ID'])
-
-        for vsd_l3domain in cls.vsd_l3domains:
-            cls.nuage_vsd_client.delete_domain(vsd_l3domain[0]['ID'])
-
-        for vsd_l3dom_template in cls.vsd_l3dom_templates:
-            cls.nuage_vsd_client.delete_l3domaintemplate(vsd_l3dom_template[0]['ID'])
-
-        for vsd_shared_domain in cls.vsd_shared_domains:
-            cls.nuage_vsd_client.delete_vsd_shared_resource(vsd_shared_domain[0]['ID'])
+        vsd = cls.nuage_vsd_client
+        cleanup = teardown.TearDown()
+        policy_groups = cleanup.add_all(
+            'policygroup', cls.vsd_policy_groups,
+            lambda policy_group: vsd.delete_policygroup(
+                policy_group[0]['id']))
+        l2domains = cleanup.add_all(
+            'l2domain', cls.vsd_l2domains,
+            lambda l2domain: vsd.delete_l2domain(l2domain[0]['ID']),
+            after=policy_groups)
+        cleanup.add_all(
+            'l2domaintemplate', cls.vsd_l2dom_templates,
+            lambda template: vsd.delete_l2domaintemplate(template[0]['ID']),
+            after=l2domains)
+        subnets = cleanup.add_all(
+            'subnet', cls.vsd_subnets,
+            lambda subnet: vsd.delete_domain_subnet(subnet[0]['ID']))
+        zones = cleanup.add_all(
+            'zone', cls.vsd_zones,
+            lambda zone: vsd.delete_zone(zone[0]['ID']), after=subnets)
+        l3domains = cleanup.add_all(
+            'l3domain', cls.vsd_l3domains,
+            lambda l3domain: vsd.delete_domain(l3domain[0]['ID']),
+            after=policy_groups + zones)
+        cleanup.add_all(
+            'l3domaintemplate', cls.vsd_l3dom_templates,
+            lambda template: vsd.delete_l3domaintemplate(template[0]['ID']),
+            after=l3domains)
+        cleanup.add_all(
+            'sharednetworkresource', cls.vsd_shared_domains,
+            lambda shared: vsd.delete_vsd_shared_resource(shared[0]['ID']),
+            after=l2domains + subnets)
+        cleanup.run()
 
     @classmethod
     def create_vsd_dhcpmanaged_l2dom_template(cls, **kwargs):
@@ -1,4 +1,5 @@
 from nuagetempest.lib import test_base as base
+from nuagetempest.lib.utils import vsd_filter
 from tempest import test
 import re
 import unittest
@@ -14,11 +15,8 @@ class IpAntiSpoofingVSDBase():
         l2domain_ext_id = base.get_external_id(l2dom['id'])
         vsd_l2domain = obj.TB.vsd_1.get_l2domain(
             filter=base.get_filter_str('externalID', l2domain_ext_id))
-        vsd_ports = vsd_l2domain.vports.get()
-        while vsd_ports.__len__() > 0:
-            vsd_port = vsd_ports.pop()
-            if port['id'] == vsd_port.name:
-                break
+        vsd_port = vsd_l2domain.vports.get_first(
+            filter=str(vsd_filter.where(name=port['id'])))
         return (vsd_l2domain, vsd_port)
 
     def _get_vsd_router_subnet_port(self, router, subnet, port, obj):
@@ -39,12 +37,8 @@ class IpAntiSpoofingVSDBase():
             filter='name == "{}"'.format(obj.def_net_partition))
         l2dom_vsd_sub = obj.TB.vsd_1.get_l2domain(enterprise=vsd_ent.id,
             filter='name == "{}"'.format(vsd_sub['name']))
-        port_ext_id = base.get_external_id(port['id'])
-        vsd_ports = l2dom_vsd_sub.vports.get()
-        while vsd_ports.__len__() > 0:
-            vsd_port = vsd_ports.pop()
-            if port['id'] == vsd_port.name:
-                break
+        vsd_port = l2dom_vsd_sub.vports.get_first(
+            filter=str(vsd_filter.where(name=port['id'])))
         return vsd_port
     
     def _get_port_for_vsd_managed_l3domain(self, vsd_l3dom, vsd_sub, port, obj):